@@ -0,0 +1,228 @@
+import os
+import sys
+import asyncio
+from datetime import date
+from fastapi import HTTPException
+
+# --- Archive tier for cold years of transactions and income ---
+# The live tables keep their foreign keys and FULLTEXT indexes, neither of which MySQL allows on
+# partitioned tables. Whole years older than ARCHIVE_KEEP_YEARS are moved instead into
+# <table>_archive: compressed, partitioned by RANGE (YEAR(date)), without constraints. List
+# endpoints read both tables as one, and a start_date/end_date filter lets MySQL prune the
+# archive down to the years it covers. Archived rows are read-only until restored.
+# Balances and rollups are unaffected by a move; their rebuilds read both tables.
+# Transactions with attachments stay live, since attachments reference them.
+
+ARCHIVE_KEEP_YEARS = max(int(os.getenv("ARCHIVE_KEEP_YEARS", 2)), 1)
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+ARCHIVE_LOCK = "finance_archive"
+
+ARCHIVED = {"transactions": "transactions_archive", "income": "income_archive"}
+
+# Shared by both tiers, so reads can UNION them; live tables gained user_id in migration 10
+COLUMNS = {
+    "transactions": ("id", "account_id", "user_id", "amount", "date", "description", "category", "currency"),
+    "income": ("id", "account_id", "user_id", "amount", "date", "source"),
+}
+
+_PARTITIONING = '''
+    ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8
+    PARTITION BY RANGE (YEAR(date)) (PARTITION pmax VALUES LESS THAN MAXVALUE)
+'''
+
+# Partitioned tables need the partitioning column in every unique key, hence PRIMARY KEY (id, date)
+ARCHIVE_TABLES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS transactions_archive (
+        id INT NOT NULL,
+        account_id INT,
+        user_id INT,
+        amount DECIMAL(15,2) NOT NULL,
+        date DATE NOT NULL,
+        description VARCHAR(255),
+        category VARCHAR(100),
+        currency VARCHAR(10) DEFAULT 'USD',
+        PRIMARY KEY (id, date),
+        KEY idx_transactions_archive_user_date (user_id, date, id),
+        KEY idx_transactions_archive_account_date (account_id, date, id)
+    )''' + _PARTITIONING,
+    '''
+    CREATE TABLE IF NOT EXISTS income_archive (
+        id INT NOT NULL,
+        account_id INT,
+        user_id INT,
+        amount DECIMAL(15,2) NOT NULL,
+        date DATE NOT NULL,
+        source VARCHAR(100),
+        PRIMARY KEY (id, date),
+        KEY idx_income_archive_user_date (user_id, date, id),
+        KEY idx_income_archive_account_date (account_id, date, id)
+    )''' + _PARTITIONING,
+]
+
+
+def select_columns(table, alias):
+    return ", ".join(f"{alias}.{column}" for column in COLUMNS[table])
+
+
+def tiered_page(live_query, live_params, archive_query, archive_params, order, limit, offset):
+    """
+    Page over the live and archive rows as one result: each side is cut to limit + offset rows
+    in `order` (unqualified columns), then the merged rows are paged again.
+    """
+    inner = limit + offset
+    query = (
+        f"SELECT * FROM ({live_query} ORDER BY {order} LIMIT %s) AS live_rows UNION ALL "
+        f"SELECT * FROM ({archive_query} ORDER BY {order} LIMIT %s) AS archived_rows ORDER BY {order} LIMIT %s OFFSET %s"
+    )
+    return query, [*live_params, inner, *archive_params, inner, limit, offset]
+
+
+async def fetch_owned(cursor, table, row_id, user_id):
+    """
+    The user's row from either tier, or None.
+    """
+    columns = ", ".join(COLUMNS[table])
+    await cursor.execute(
+        f"SELECT {columns} FROM {table} WHERE id=%s AND user_id=%s UNION ALL SELECT {columns} FROM {ARCHIVED[table]} WHERE id=%s AND user_id=%s",
+        (row_id, user_id, row_id, user_id)
+    )
+    return await cursor.fetchone()
+
+
+async def reject_archived(cursor, table, row_id, user_id, label):
+    """
+    For a write that found no live row: answer 409 if the user's row is in the archive.
+    """
+    await cursor.execute(f"SELECT 1 FROM {ARCHIVED[table]} WHERE id=%s AND user_id=%s", (row_id, user_id))
+    if await cursor.fetchone():
+        raise HTTPException(status_code=409, detail=f"{label} is archived and read-only")
+
+
+async def _ensure_partition(cursor, table, year):
+    await cursor.execute(
+        "SELECT MAX(CAST(partition_description AS UNSIGNED)) FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND partition_description <> 'MAXVALUE'",
+        (table,)
+    )
+    bound = (await cursor.fetchone())[0]
+    # Years below the highest bound already fall into an existing partition
+    if bound is None or year >= bound:
+        await cursor.execute(
+            f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+            f"(PARTITION p{year} VALUES LESS THAN ({year + 1}), PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        )
+
+
+async def _move(conn, source, target, columns, year, batch_size, extra=""):
+    moved = 0
+    while True:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"SELECT id FROM {source} WHERE date >= %s AND date < %s{extra} ORDER BY id LIMIT %s FOR UPDATE",
+                (date(year, 1, 1), date(year + 1, 1, 1), batch_size)
+            )
+            ids = [row[0] for row in await cursor.fetchall()]
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                await cursor.execute(f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} WHERE id IN ({placeholders})", ids)
+                await cursor.execute(f"DELETE FROM {source} WHERE id IN ({placeholders})", ids)
+        await conn.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+
+
+async def _bump_versions(conn, table, year):
+    # Cached API responses of the users whose rows moved are stale (archived flags, 409s)
+    from app.http_cache import bump_data_versions
+    async with conn.cursor() as cursor:
+        await bump_data_versions(
+            cursor, f" WHERE id IN (SELECT user_id FROM {table} WHERE date >= %s AND date < %s)",
+            (date(year, 1, 1), date(year + 1, 1, 1))
+        )
+    await conn.commit()
+
+
+async def archive_year(conn, table, year, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move one year of live rows into the archive in batches. Returns the number of rows moved.
+    """
+    async with conn.cursor() as cursor:
+        await _ensure_partition(cursor, ARCHIVED[table], year)
+    keep = " AND id NOT IN (SELECT transaction_id FROM attachments)" if table == "transactions" else ""
+    moved = await _move(conn, table, ARCHIVED[table], ", ".join(COLUMNS[table]), year, batch_size, keep)
+    if moved:
+        await _bump_versions(conn, ARCHIVED[table], year)
+    return moved
+
+
+async def restore_year(conn, table, year, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move one archived year back into the live table, making it writable again.
+    """
+    moved = await _move(conn, ARCHIVED[table], table, ", ".join(COLUMNS[table]), year, batch_size)
+    if moved:
+        await _bump_versions(conn, table, year)
+    return moved
+
+
+async def cold_years(conn, table, keep_years=ARCHIVE_KEEP_YEARS):
+    cutoff = date(date.today().year - keep_years + 1, 1, 1)
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"SELECT DISTINCT YEAR(date) FROM {table} WHERE date < %s ORDER BY 1", (cutoff,))
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def _locked(conn):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT GET_LOCK(%s, 0)", (ARCHIVE_LOCK,))
+        return (await cursor.fetchone())[0] == 1
+
+
+async def _main(argv):
+    from app.database import pooled_connection
+    usage = "usage: python -m app.archive run [keep_years] | restore <year> [transactions|income] | status"
+    if not argv or argv[0] not in ("run", "restore", "status"):
+        print(usage)
+        return 2
+    async with pooled_connection() as conn:
+        if argv[0] == "status":
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT table_name, partition_name, table_rows FROM information_schema.partitions "
+                    "WHERE table_schema = DATABASE() AND table_name IN %s ORDER BY table_name, partition_ordinal_position",
+                    (tuple(ARCHIVED.values()),)
+                )
+                for table, partition, rows in await cursor.fetchall():
+                    print(f"{table}.{partition}: ~{rows} row(s)")
+            return 0
+        if not await _locked(conn):
+            print("Another archive run is in progress.")
+            return 1
+        try:
+            if argv[0] == "run":
+                keep_years = int(argv[1]) if len(argv) > 1 else ARCHIVE_KEEP_YEARS
+                for table in ARCHIVED:
+                    for year in await cold_years(conn, table, max(keep_years, 1)):
+                        print(f"{table} {year}: archived {await archive_year(conn, table, year)} row(s)")
+            else:
+                if len(argv) < 2:
+                    print(usage)
+                    return 2
+                year = int(argv[1])
+                tables = argv[2:] or list(ARCHIVED)
+                if any(table not in ARCHIVED for table in tables):
+                    print(usage)
+                    return 2
+                for table in tables:
+                    print(f"{table} {year}: restored {await restore_year(conn, table, year)} row(s)")
+        finally:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT RELEASE_LOCK(%s)", (ARCHIVE_LOCK,))
+                await cursor.fetchone()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,152 @@
+import os
+import hashlib
+import uuid
+import anyio
+
+# --- Content-addressed attachment storage ---
+# Files live under ATTACHMENTS_DIR at <sha256[:2]>/<sha256>, so identical uploads share one file.
+# Uploads stream to a temp file while hashing and are moved into place afterwards. Placing a
+# file and removing the last row that references it both run under a MySQL named lock on the
+# hash, so a concurrent upload of the same content can never lose its file. Deleting a
+# transaction removes its attachments the same way (lock_transaction_files/release_files).
+
+ATTACHMENTS_DIR = os.getenv("ATTACHMENTS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "attachments"))
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", 20 * 1024 * 1024))
+LOCK_TIMEOUT = 10
+
+
+class TooLarge(Exception):
+    pass
+
+
+def relative_path(digest):
+    return f"{digest[:2]}/{digest}"
+
+
+def absolute_path(file_path):
+    return os.path.join(ATTACHMENTS_DIR, file_path)
+
+
+async def receive(chunks, max_bytes=ATTACHMENT_MAX_BYTES):
+    """
+    Write an async iterable of byte chunks to a temp file. Returns (temp_path, sha256, size).
+    """
+    tmp_dir = os.path.join(ATTACHMENTS_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    temp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(temp_path, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise TooLarge(f"Attachments are limited to {max_bytes} bytes")
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        discard(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def discard(temp_path):
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def _lock(cursor, file_path):
+    await cursor.execute("SELECT GET_LOCK(%s, %s)", (f"attachment:{file_path}", LOCK_TIMEOUT))
+    if (await cursor.fetchone())[0] != 1:
+        raise RuntimeError("Timed out waiting for the attachment lock")
+
+
+async def _unlock(cursor, file_path):
+    await cursor.execute("SELECT RELEASE_LOCK(%s)", (f"attachment:{file_path}",))
+    await cursor.fetchone()
+
+
+async def store(conn, temp_path, digest, row):
+    """
+    Insert the attachments row and move the temp file into place, unless the content is
+    already stored. row is (user_id, transaction_id, file_name, size, content_type).
+    Returns the new attachment id.
+    """
+    file_path = relative_path(digest)
+    target = absolute_path(file_path)
+    async with conn.cursor() as cursor:
+        await _lock(cursor, file_path)
+        try:
+            await cursor.execute(
+                "INSERT INTO attachments (user_id, transaction_id, file_name, size, content_type, file_path) VALUES (%s, %s, %s, %s, %s, %s)",
+                (*row, file_path)
+            )
+            attachment_id = cursor.lastrowid
+            if os.path.exists(target):
+                discard(temp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+            await conn.commit()
+        finally:
+            await _unlock(cursor, file_path)
+    return attachment_id
+
+
+async def remove(conn, attachment_id, file_path):
+    """
+    Delete the attachments row, and the file once no other row references it.
+    """
+    async with conn.cursor() as cursor:
+        await _lock(cursor, file_path)
+        try:
+            await cursor.execute("DELETE FROM attachments WHERE id=%s", (attachment_id,))
+            deleted = cursor.rowcount > 0
+            await cursor.execute("SELECT COUNT(*) FROM attachments WHERE file_path=%s", (file_path,))
+            remaining = (await cursor.fetchone())[0]
+            await conn.commit()
+            if deleted and not remaining:
+                discard(absolute_path(file_path))
+        finally:
+            await _unlock(cursor, file_path)
+    return deleted
+
+
+async def lock_transaction_files(cursor, tx_id, user_id):
+    """
+    Take the named locks for every file the transaction's attachments reference, in a fixed
+    order. Call before locking the transaction row: an upload holds its file lock while its
+    insert waits on that row. Returns the locked file paths.
+    """
+    await cursor.execute(
+        "SELECT DISTINCT file_path FROM attachments WHERE transaction_id=%s AND user_id=%s ORDER BY file_path",
+        (tx_id, user_id)
+    )
+    file_paths = [row[0] for row in await cursor.fetchall()]
+    locked = []
+    try:
+        for file_path in file_paths:
+            await _lock(cursor, file_path)
+            locked.append(file_path)
+    except BaseException:
+        await unlock_files(cursor, locked)
+        raise
+    return file_paths
+
+
+async def release_files(cursor, file_paths):
+    """
+    After the attachment rows were deleted and committed: remove the files no row references
+    any more. Only for file paths locked with lock_transaction_files.
+    """
+    for file_path in file_paths:
+        await cursor.execute("SELECT COUNT(*) FROM attachments WHERE file_path=%s", (file_path,))
+        if not (await cursor.fetchone())[0]:
+            discard(absolute_path(file_path))
+
+
+async def unlock_files(cursor, file_paths):
+    for file_path in file_paths:
+        await _unlock(cursor, file_path)
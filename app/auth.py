@@ -1,4 +1,5 @@
 import os
+import time
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
@@ -6,11 +7,14 @@ from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from app.models import TokenData
-from app.routers.login import SECRET_KEY, ALGORITHM, get_user_by_username
+from app.routers.login import SECRET_KEY, ALGORITHM, get_user_by_username, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -24,7 +28,10 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user_by_username(token_data.username)
+    user = await get_user_by_username(token_data.username)
     if user is None:
         raise credentials_exception
+    # Never serve a cached user past the token's own expiry
+    exp = payload.get("exp")
+    user_cache.set(token, user, ttl=exp - time.time() if exp else None)
     return user
@@ -0,0 +1,121 @@
+import os
+import sys
+import asyncio
+from collections import defaultdict
+from decimal import Decimal
+from app import archive
+
+# --- Incrementally maintained account balances ---
+# accounts.balance = opening_balance + SUM(income) - SUM(transactions). Income and transaction
+# writes apply the difference in the same DB transaction, so reading a balance is a single row.
+# reconcile() recomputes the same formula from the ledger to detect and repair drift.
+
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", 500))
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", 4))
+
+
+def ledger_balance_sql(archived=True):
+    """
+    The balance formula over the live ledger, plus the archive tables (see app.archive) when archived.
+    """
+    def total(table):
+        tables = [table, archive.ARCHIVED[table]] if archived else [table]
+        return " + ".join(f"COALESCE((SELECT SUM(x.amount) FROM {name} x WHERE x.account_id = a.id), 0)" for name in tables)
+    return f"a.opening_balance + {total('income')} - ({total('transactions')})"
+
+
+LEDGER_BALANCE_SQL = ledger_balance_sql()
+
+
+def income_delta(account_id, amount, sign=1):
+    return (account_id, Decimal(str(amount)) * sign)
+
+
+def transaction_delta(account_id, amount, sign=1):
+    # Transactions are money out of the account
+    return (account_id, -Decimal(str(amount)) * sign)
+
+
+async def apply_deltas(cursor, deltas):
+    """
+    Add each (account_id, amount) delta to accounts.balance, merging deltas per account first.
+    """
+    totals = defaultdict(Decimal)
+    for account_id, amount in deltas:
+        if account_id is not None:
+            totals[account_id] += amount
+    rows = [(amount, account_id) for account_id, amount in sorted(totals.items()) if amount]
+    if rows:
+        # Sorted by id so concurrent writers lock account rows in the same order
+        await cursor.executemany("UPDATE accounts SET balance = balance + %s WHERE id = %s", rows)
+
+
+async def recompute_all(cursor, archived=True):
+    await cursor.execute(f"UPDATE accounts a SET a.balance = {ledger_balance_sql(archived)}")
+
+
+async def _reconcile_batch(first_id, last_id, fix):
+    from app.database import pooled_connection
+    from app.http_cache import bump_data_versions
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            # Lock the accounts first: writers queue behind us, and the ledger snapshot taken
+            # afterwards contains exactly the deltas already applied to balance
+            await cursor.execute("SELECT id FROM accounts WHERE id BETWEEN %s AND %s FOR UPDATE", (first_id, last_id))
+            await cursor.execute(
+                f"SELECT a.id, a.balance, {LEDGER_BALANCE_SQL} AS expected FROM accounts a WHERE a.id BETWEEN %s AND %s",
+                (first_id, last_id)
+            )
+            # Compared in cents: the SQLite backend sums amounts as REAL
+            drift = [
+                {"account_id": account_id, "balance": float(balance or 0), "expected": float(expected), "drift": float(round((balance or 0) - expected, 2))}
+                for account_id, balance, expected in await cursor.fetchall()
+                if round((balance or 0) - expected, 2)
+            ]
+            if fix and drift:
+                await cursor.executemany(
+                    "UPDATE accounts SET balance = %s WHERE id = %s",
+                    [(row["expected"], row["account_id"]) for row in drift]
+                )
+                account_ids = [row["account_id"] for row in drift]
+                placeholders = ", ".join(["%s"] * len(account_ids))
+                await bump_data_versions(cursor, f" WHERE id IN (SELECT user_id FROM accounts WHERE id IN ({placeholders}))", account_ids)
+        await conn.commit()
+    return drift
+
+
+async def reconcile(fix=False, batch_size=RECONCILE_BATCH_SIZE, concurrency=RECONCILE_CONCURRENCY):
+    """
+    Recompute every balance from the ledger in id-range batches, running up to `concurrency`
+    batches at once on separate pooled connections. Returns the accounts that drifted.
+    """
+    from app.database import pooled_connection
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT id FROM accounts ORDER BY id")
+            ids = [row[0] for row in await cursor.fetchall()]
+    ranges = [(batch[0], batch[-1]) for batch in (ids[i:i + batch_size] for i in range(0, len(ids), batch_size))]
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(first_id, last_id):
+        async with slots:
+            return await _reconcile_batch(first_id, last_id, fix)
+
+    results = await asyncio.gather(*(run(first_id, last_id) for first_id, last_id in ranges))
+    return [row for batch in results for row in batch]
+
+
+async def _main(argv):
+    if not argv or argv[0] != "reconcile":
+        print("usage: python -m app.balances reconcile [--fix]")
+        return 2
+    fix = "--fix" in argv[1:]
+    drift = await reconcile(fix=fix)
+    for row in drift:
+        print(f"account {row['account_id']}: balance {row['balance']:.2f}, ledger {row['expected']:.2f}, drift {row['drift']:+.2f}")
+    print(f"{len(drift)} account(s) drifted" + (", fixed." if fix and drift else "."))
+    return 1 if drift and not fix else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,426 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextvars
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+
+# The benchmark measures request handling; the due-payment scheduler would only add noise
+os.environ.setdefault("NOTIFY_SCHEDULER", "0")
+
+from app.database import pooled_connection, initialize_schema, DictCursor, DB_BACKEND
+from app import rollups, balances, budgets
+
+# --- Load and latency benchmarks ---
+# `seed` fills the configured database (MySQL, or SQLite with DB_BACKEND=sqlite) with synthetic
+# users, accounts and a large transaction ledger, then rebuilds the derived tables. `run` drives
+# the /v1 endpoints scenario by scenario at a fixed concurrency, through an in-process ASGI
+# client, a uvicorn server started in-process, or any base URL, and reports latency percentiles,
+# throughput and DB statements per request. Results can be saved as a named baseline under
+# BENCH_DIR and later runs compared against it.
+
+BENCH_DIR = os.getenv("BENCH_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", 0.25))
+BENCH_SEED_BATCH_SIZE = int(os.getenv("BENCH_SEED_BATCH_SIZE", 5000))
+
+USER_PREFIX = "bench_user_"
+PASSWORD = "bench-password"
+CATEGORIES = ("groceries", "rent", "utilities", "travel", "dining", "transport", "health", "entertainment")
+WORDS = ("market", "coffee", "station", "pharmacy", "cinema", "airline", "hotel", "bakery", "garage", "bookstore", "electric", "water")
+
+# Statements issued through any cursor, for the queries-per-request column
+_queries = 0
+_in_executemany = contextvars.ContextVar("bench_in_executemany", default=False)
+
+
+def _count_queries():
+    """
+    Wrap execute/executemany on both backends' cursor classes to count statements. A call to
+    executemany counts once, although aiomysql runs non-INSERT statements one by one.
+    """
+    import aiomysql.cursors
+    from app import sqlite_backend
+
+    def counted(original, nested):
+        async def wrapper(self, *args, **kwargs):
+            global _queries
+            if not _in_executemany.get():
+                _queries += 1
+            token = _in_executemany.set(True) if nested else None
+            try:
+                return await original(self, *args, **kwargs)
+            finally:
+                if token is not None:
+                    _in_executemany.reset(token)
+        wrapper.counted = True
+        return wrapper
+
+    for cls in (aiomysql.cursors.Cursor, sqlite_backend.Cursor):
+        for name in ("execute", "executemany"):
+            original = getattr(cls, name)
+            if not getattr(original, "counted", False):
+                setattr(cls, name, counted(original, name == "executemany"))
+
+
+# --- Seeding ---
+
+async def _insert(cursor, query, params):
+    await cursor.execute(query, params)
+    return cursor.lastrowid
+
+
+async def seed(users=10, accounts_per_user=3, transactions=1_000_000, years=3, random_seed=0):
+    """
+    Create the bench users and their data. Returns False if they already exist.
+    """
+    from app.passwords import hash_password
+    from app.routers.transactions import INSERT_TRANSACTION_SQL
+
+    rng = np.random.default_rng(random_seed)
+    today = date.today()
+    first_day = today - timedelta(days=365 * years)
+    days = [first_day + timedelta(days=offset) for offset in range((today - first_day).days + 1)]
+    password_hash = await hash_password(PASSWORD)
+
+    await initialize_schema()
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE %s", (USER_PREFIX + "%",))
+            if (await cursor.fetchone())[0]:
+                return False
+            accounts = []
+            for i in range(users):
+                username = f"{USER_PREFIX}{i}"
+                user_id = await _insert(cursor, "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)", (username, f"{username}@example.com", password_hash))
+                user_accounts = []
+                for j in range(accounts_per_user):
+                    opening = round(float(rng.uniform(500, 20000)), 2)
+                    account_id = await _insert(
+                        cursor,
+                        "INSERT INTO accounts (name, type, balance, opening_balance, currency, user_id) VALUES (%s, %s, %s, %s, %s, %s)",
+                        (f"Account {j + 1}", ("checking", "savings", "credit")[j % 3], opening, opening, "USD", user_id)
+                    )
+                    user_accounts.append(account_id)
+                    accounts.append((account_id, user_id))
+                main = user_accounts[0]
+                # A monthly salary, so the forecast finds recurring income
+                await cursor.executemany(
+                    "INSERT INTO income (account_id, amount, date, source, user_id) VALUES (%s, %s, %s, %s, %s)",
+                    [(main, 4200.00, day, "Salary", user_id) for day in days if day.day == 25]
+                )
+                await cursor.executemany(
+                    "INSERT INTO monthly_payments (account_id, amount, due_date, description, user_id) VALUES (%s, %s, %s, %s, %s)",
+                    [(main, 1450.00, today.replace(day=1), "Rent", user_id), (main, 85.50, today + timedelta(days=2), "Electric bill", user_id)]
+                )
+                await cursor.execute(
+                    "INSERT INTO installments (account_id, total_amount, installment_amount, start_date, end_date, description, user_id) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    (main, 2400.00, 200.00, today - timedelta(days=90), today + timedelta(days=300), "Laptop", user_id)
+                )
+                await cursor.execute(
+                    "INSERT INTO credit_cards (account_id, card_number, limit_amount, balance, due_date, user_id) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (main, f"4000-0000-0000-{i:04d}", 5000.00, 640.00, today + timedelta(days=10), user_id)
+                )
+                await cursor.executemany(
+                    "INSERT INTO budgets (user_id, account_id, category, amount, period) VALUES (%s, %s, %s, %s, %s)",
+                    [(user_id, None, "groceries", 600.00, "monthly"), (user_id, None, "dining", 150.00, "weekly")]
+                )
+        await conn.commit()
+
+        inserted = 0
+        while inserted < transactions:
+            count = min(BENCH_SEED_BATCH_SIZE, transactions - inserted)
+            owners = rng.integers(0, len(accounts), count)
+            offsets = rng.integers(0, len(days), count)
+            amounts = np.round(rng.uniform(1, 250, count), 2)
+            categories = rng.integers(0, len(CATEGORIES), count)
+            words = rng.integers(0, len(WORDS), (count, 2))
+            rows = [
+                (accounts[owner][0], amount, days[offset], f"{WORDS[first].title()} {WORDS[second]}", CATEGORIES[category], "USD", accounts[owner][1])
+                for owner, offset, amount, category, (first, second)
+                in zip(owners.tolist(), offsets.tolist(), amounts.tolist(), categories.tolist(), words.tolist())
+            ]
+            async with conn.cursor() as cursor:
+                await cursor.executemany(INSERT_TRANSACTION_SQL, rows)
+            await conn.commit()
+            inserted += count
+            print(f"\r{inserted}/{transactions} transactions", end="", flush=True)
+        print()
+
+        async with conn.cursor() as cursor:
+            await rollups.rebuild(cursor)
+            await balances.recompute_all(cursor)
+            await budgets.rebuild(cursor)
+        await conn.commit()
+    return True
+
+
+# --- Scenarios ---
+
+def _page(user, i):
+    return "GET", "/v1/transactions/?limit=50", None
+
+
+def _filtered(user, i):
+    account_id = user["accounts"][i % len(user["accounts"])]
+    start = (date.today() - timedelta(days=90)).isoformat()
+    return "GET", f"/v1/transactions/?account_id={account_id}&start_date={start}&limit=50", None
+
+
+def _search(user, i):
+    return "GET", f"/v1/transactions/?search={WORDS[i % len(WORDS)]}&limit=50", None
+
+
+def _create(user, i):
+    return "POST", "/v1/transactions/", {
+        "id": None,
+        "account_id": user["accounts"][i % len(user["accounts"])],
+        "amount": 12.5,
+        "date": date.today().isoformat(),
+        "description": "Bench coffee",
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "currency": "USD",
+    }
+
+
+SCENARIOS = {
+    "accounts": lambda user, i: ("GET", "/v1/accounts/", None),
+    "transactions_page": _page,
+    "transactions_filtered": _filtered,
+    "transactions_search": _search,
+    "transaction_get": lambda user, i: ("GET", f"/v1/transactions/{user['transaction_id']}", None),
+    "summary_month": lambda user, i: ("GET", "/v1/transactions/summary?granularity=month", None),
+    "dashboard": lambda user, i: ("GET", "/v1/dashboard/", None),
+    "forecast": lambda user, i: ("GET", "/v1/forecast/", None),
+    "budgets_status": lambda user, i: ("GET", "/v1/budgets/status", None),
+    "installments_projection": lambda user, i: ("GET", "/v1/installments/projection", None),
+    "notifications": lambda user, i: ("GET", "/v1/notifications/", None),
+    "transaction_create": _create,
+}
+
+
+async def _bench_users(limit):
+    from app.routers.login import create_access_token
+    async with pooled_connection() as conn:
+        async with conn.cursor(DictCursor) as cursor:
+            await cursor.execute("SELECT id, username FROM users WHERE username LIKE %s ORDER BY id LIMIT %s", (USER_PREFIX + "%", limit))
+            users = await cursor.fetchall()
+            for user in users:
+                await cursor.execute("SELECT id FROM accounts WHERE user_id = %s ORDER BY id", (user["id"],))
+                user["accounts"] = [row["id"] for row in await cursor.fetchall()]
+                await cursor.execute("SELECT id FROM transactions WHERE user_id = %s ORDER BY date DESC, id DESC LIMIT 1", (user["id"],))
+                row = await cursor.fetchone()
+                user["transaction_id"] = row["id"] if row else 0
+                user["headers"] = {"Authorization": f"Bearer {create_access_token({'sub': user['username']})}"}
+    return users
+
+
+@asynccontextmanager
+async def _client(target, concurrency, port):
+    import httpx
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(60.0)
+    if target not in ("asgi", "uvicorn"):
+        async with httpx.AsyncClient(base_url=target, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+    from app.main import app
+    if target == "asgi":
+        await app.router.startup()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limits, timeout=timeout) as client:
+                yield client
+        finally:
+            await app.router.shutdown()
+        return
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=timeout) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await serving
+
+
+async def run_scenario(client, build, users, requests, concurrency, warmup=10):
+    """
+    Send `requests` requests built by build(user, i), `concurrency` at a time, cycling through
+    users. Returns the scenario's metrics; latencies are in milliseconds.
+    """
+    async def send(i):
+        user = users[i % len(users)]
+        method, path, body = build(user, i)
+        started = time.perf_counter()
+        response = await client.request(method, path, json=body, headers=user["headers"])
+        return time.perf_counter() - started, response.status_code
+
+    for i in range(warmup):
+        await send(i)
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            elapsed, status = await send(i)
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+
+    queries_before = _queries
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": round(requests / elapsed, 1),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(ms.max()), 2),
+        "queries": round((_queries - queries_before) / requests, 2),
+    }
+
+
+async def run(scenarios, target="asgi", requests=500, concurrency=10, users=10, port=8765, response_cache=True):
+    in_process = target in ("asgi", "uvicorn")
+    if in_process:
+        _count_queries()
+        if not response_cache:
+            from app.http_cache import response_cache as cache
+            cache.ttl = 0
+    bench_users = await _bench_users(users)
+    if not bench_users:
+        raise SystemExit("No bench users found; run `python -m app.bench seed` first.")
+    results = {}
+    async with _client(target, concurrency, port) as client:
+        for name in scenarios:
+            metrics = await run_scenario(client, SCENARIOS[name], bench_users, requests, concurrency)
+            if not in_process:
+                # Statements run in another process
+                metrics["queries"] = None
+            results[name] = metrics
+            _print_row(name, metrics)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "backend": DB_BACKEND,
+        "target": target,
+        "concurrency": concurrency,
+        "requests": requests,
+        "users": len(bench_users),
+        "response_cache": response_cache,
+        "results": results,
+    }
+
+
+# --- Reporting and baselines ---
+
+HEADER = f"{'scenario':<24} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'queries':>8}"
+
+
+def _print_row(name, m):
+    queries = "-" if m["queries"] is None else f"{m['queries']:.2f}"
+    print(f"{name:<24} {m['requests']:>6} {m['errors']:>5} {m['throughput']:>8.1f} {m['p50']:>8.2f} {m['p95']:>8.2f} {m['p99']:>8.2f} {m['max']:>8.2f} {queries:>8}")
+
+
+def _baseline_path(name):
+    return os.path.join(BENCH_DIR, f"{name}.json")
+
+
+def save_baseline(name, report):
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(_baseline_path(name), "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def compare(report, baseline, tolerance=BENCH_TOLERANCE):
+    """
+    Regressions of report against baseline: p95 latency or throughput worse by more than
+    `tolerance`, new errors, or an extra DB statement per request.
+    """
+    regressions = []
+    for name, m in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if m["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95']:.2f} -> {m['p95']:.2f} ms")
+        if m["throughput"] < base["throughput"] / (1 + tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']:.1f} -> {m['throughput']:.1f} req/s")
+        if m["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {m['errors']}")
+        # Response cache hits make the average fractional; an extra statement per request is >= 1
+        if m["queries"] is not None and base["queries"] is not None and m["queries"] >= base["queries"] + 0.5:
+            regressions.append(f"{name}: queries/request {base['queries']:.2f} -> {m['queries']:.2f}")
+    return regressions
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description="Seed synthetic data and benchmark the API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed_parser = commands.add_parser("seed", help="create bench users, accounts and transactions")
+    seed_parser.add_argument("--users", type=int, default=10)
+    seed_parser.add_argument("--accounts", type=int, default=3, help="accounts per user")
+    seed_parser.add_argument("--transactions", type=int, default=1_000_000)
+    seed_parser.add_argument("--years", type=int, default=3, help="spread transactions over this many years")
+    seed_parser.add_argument("--seed", type=int, default=0, help="random seed")
+    run_parser = commands.add_parser("run", help="benchmark endpoints")
+    run_parser.add_argument("--target", default="asgi", help="asgi (in-process), uvicorn (in-process server) or a base URL")
+    run_parser.add_argument("--port", type=int, default=8765, help="port for --target uvicorn")
+    run_parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    run_parser.add_argument("--concurrency", type=int, default=10)
+    run_parser.add_argument("--users", type=int, default=10, help="bench users to spread requests over")
+    run_parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable; default all")
+    run_parser.add_argument("--no-response-cache", action="store_true", help="disable the in-process response cache")
+    run_parser.add_argument("--save", metavar="NAME", help=f"save results as a baseline under {BENCH_DIR}")
+    run_parser.add_argument("--compare", metavar="NAME", help="compare with a saved baseline; exit 1 on regression")
+    run_parser.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE)
+    return parser
+
+
+async def _main(argv):
+    args = _parser().parse_args(argv)
+    if args.command == "seed":
+        started = time.perf_counter()
+        if not await seed(args.users, args.accounts, args.transactions, args.years, args.seed):
+            print("Bench users already exist; nothing seeded.")
+            return 0
+        print(f"Seeded {args.users} users, {args.users * args.accounts} accounts and {args.transactions} transactions in {time.perf_counter() - started:.1f}s.")
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(_baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+    print(f"backend={DB_BACKEND} target={args.target} concurrency={args.concurrency} requests={args.requests}")
+    print(HEADER)
+    report = await run(args.scenario or list(SCENARIOS), args.target, args.requests, args.concurrency, args.users, args.port, not args.no_response_cache)
+    if args.save:
+        save_baseline(args.save, report)
+        print(f"Saved baseline {_baseline_path(args.save)}")
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regression(s) against baseline {args.compare}.")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from app import pubsub
+
+# --- Incremental budget spend tracking ---
+# budget_spend holds each budget's spend per period (weekly, monthly or yearly, keyed by the
+# period's first day). Transaction writes add their amounts to every matching budget in the
+# same DB transaction: same owner, the budget's account (or any account if it has none) and
+# the budget's category (or any category if it has none). Reading a budget's status is then a
+# primary-key lookup. The first write that takes a period over its amount creates a
+# notification; dropping back under re-arms it.
+
+PERIODS = ("weekly", "monthly", "yearly")
+
+BUDGET_TABLES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS budget_spend (
+        budget_id INT NOT NULL,
+        period_start DATE NOT NULL,
+        spent DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+        notified_at DATETIME NULL,
+        PRIMARY KEY (budget_id, period_start),
+        FOREIGN KEY (budget_id) REFERENCES budgets(id) ON DELETE CASCADE
+    )
+    ''',
+]
+
+# Same expression over a DATE column, for rebuilding from the daily rollups
+PERIOD_START_SQL = '''
+    CASE b.period
+        WHEN 'weekly' THEN DATE_SUB({day}, INTERVAL WEEKDAY({day}) DAY)
+        WHEN 'yearly' THEN MAKEDATE(YEAR({day}), 1)
+        ELSE DATE_SUB({day}, INTERVAL DAYOFMONTH({day}) - 1 DAY)
+    END
+'''
+
+MATCH_SQL = "(b.account_id IS NULL OR b.account_id = a.id) AND (b.category IS NULL OR b.category = {category})"
+
+# VALUES() rather than MySQL 8.0.19's row alias: it also runs on 5.7, matches the other upserts
+# and is what the SQLite backend translates
+UPSERT_SPEND_SQL = '''
+    INSERT INTO budget_spend (budget_id, period_start, spent) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE spent = spent + VALUES(spent)
+'''
+
+
+def spend_delta(account_id, category, day, amount, sign=1):
+    if not isinstance(day, date):
+        day = date.fromisoformat(str(day)[:10])
+    return (account_id, category, day, Decimal(str(amount)) * sign)
+
+
+def period_starts(day):
+    """
+    (weekly, monthly, yearly) period starts containing day.
+    """
+    return day - timedelta(days=day.weekday()), day.replace(day=1), day.replace(month=1, day=1)
+
+
+def period_start(period, day=None):
+    return period_starts(day or date.today())[PERIODS.index(period)]
+
+
+def _message(budget):
+    label = budget["category"] or "All spending"
+    return f"{label} is over its {budget['period']} budget: {float(budget['spent']):.2f} of {float(budget['amount']):.2f}"
+
+
+async def apply_deltas(cursor, deltas):
+    """
+    Add (account_id, category, day, amount) spend deltas to the matching budgets and create
+    notifications for budgets that just went over. Returns the new notifications, each with
+    its owner's user_id, for publish() once the caller has committed.
+    """
+    totals = defaultdict(Decimal)
+    for account_id, category, day, amount in deltas:
+        if account_id is not None and amount:
+            totals[(account_id, category, day)] += amount
+    pairs = sorted({(account_id, category) for account_id, category, _ in totals}, key=lambda pair: (pair[0], pair[1] or ""))
+    if not pairs:
+        return []
+    # Matched in SQL against the deltas' (account, category) pairs, so categories compare under the column's collation
+    derived = " UNION ALL ".join(["SELECT %s AS pair, %s AS account_id, %s AS category"] * len(pairs))
+    await cursor.execute(f'''
+        SELECT d.pair, b.id, b.period
+        FROM ({derived}) d JOIN accounts a ON a.id = d.account_id JOIN budgets b ON b.user_id = a.user_id
+        WHERE {MATCH_SQL.format(category="d.category")}
+    ''', [value for i, (account_id, category) in enumerate(pairs) for value in (i, account_id, category)])
+    matching = defaultdict(list)
+    for pair, budget_id, period in await cursor.fetchall():
+        matching[pairs[pair]].append((budget_id, period))
+    # Only the (budget_id, period_start) rows these deltas touch are written, re-armed or checked
+    spend = defaultdict(Decimal)
+    for (account_id, category, day), amount in totals.items():
+        for budget_id, period in matching[(account_id, category)]:
+            spend[(budget_id, period_start(period if period in PERIODS else "monthly", day))] += amount
+    keys = sorted(key for key, amount in spend.items() if amount)
+    if not keys:
+        return []
+    # Sorted by key so concurrent writers lock spend rows in the same order
+    await cursor.executemany(UPSERT_SPEND_SQL, [(*key, spend[key]) for key in keys])
+    touched = "(s.budget_id, s.period_start) IN (" + ", ".join(["(%s, %s)"] * len(keys)) + ")"
+    params = [value for key in keys for value in key]
+    await cursor.execute(f'''
+        UPDATE budget_spend s JOIN budgets b ON s.budget_id = b.id
+        SET s.notified_at = NULL
+        WHERE {touched} AND s.notified_at IS NOT NULL AND s.spent <= b.amount
+    ''', params)
+    await cursor.execute(f'''
+        SELECT b.id, b.user_id, b.category, b.period, b.amount, s.period_start, s.spent
+        FROM budget_spend s JOIN budgets b ON s.budget_id = b.id
+        WHERE {touched} AND s.notified_at IS NULL AND s.spent > b.amount
+        FOR UPDATE
+    ''', params)
+    columns = [column[0] for column in cursor.description]
+    over = [dict(zip(columns, row)) for row in await cursor.fetchall()]
+    created = []
+    for budget in over:
+        await cursor.execute(
+            "UPDATE budget_spend SET notified_at = NOW() WHERE budget_id = %s AND period_start = %s",
+            (budget["id"], budget["period_start"])
+        )
+        message = _message(budget)
+        await cursor.execute(
+            "INSERT INTO notifications (user_id, budget_id, cycle, message) VALUES (%s, %s, %s, %s)",
+            (budget["user_id"], budget["id"], budget["period_start"], message)
+        )
+        created.append({
+            "user_id": budget["user_id"],
+            "id": cursor.lastrowid,
+            "monthly_payment_id": None,
+            "budget_id": budget["id"],
+            "message": message,
+            "cycle": budget["period_start"],
+            "is_read": False,
+        })
+    return created
+
+
+async def publish(notifications):
+    for notification in notifications:
+        notification = dict(notification)
+        await pubsub.publish_notification(notification.pop("user_id"), notification)
+
+
+async def rebuild(cursor, budget_id=None):
+    """
+    Recompute budget_spend from the daily spending rollups, for one budget or all of them.
+    """
+    budget_filter = " WHERE b.id = %s" if budget_id is not None else ""
+    params = (budget_id,) if budget_id is not None else None
+    if budget_id is None:
+        await cursor.execute("DELETE FROM budget_spend")
+    else:
+        await cursor.execute("DELETE FROM budget_spend WHERE budget_id = %s", (budget_id,))
+    # The rollups store a NULL category as ''; the ledger tracker never matches it against a named budget either
+    await cursor.execute(f'''
+        INSERT INTO budget_spend (budget_id, period_start, spent)
+        SELECT b.id, {PERIOD_START_SQL.format(day="d.day")} AS period_start, SUM(d.amount)
+        FROM budgets b
+        JOIN accounts a ON a.user_id = b.user_id
+        JOIN transaction_daily_totals d ON d.user_id = b.user_id AND d.account_id = a.id
+        {budget_filter}{" AND" if budget_filter else " WHERE"} {MATCH_SQL.format(category="d.category")}
+        GROUP BY b.id, period_start
+    ''', params)
+    # Periods already over budget when tracking starts do not notify
+    await cursor.execute(f'''
+        UPDATE budget_spend s JOIN budgets b ON s.budget_id = b.id
+        SET s.notified_at = NOW()
+        WHERE s.spent > b.amount{" AND b.id = %s" if budget_id is not None else ""}
+    ''', params)
@@ -1,47 +1,197 @@
 import os
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
-from mysql.connector import Error
-from mysql import connector
-from app.schemas import SCHEMA_SQL
+import aiomysql
+from aiomysql import DictCursor, SSDictCursor, Error, IntegrityError
+from fastapi import HTTPException
+from app.migrations import run_migrations
+from app import sqlite_backend
 
-def create_mysql_connection():
+# "mysql", or "sqlite" for the embedded engine in app.sqlite_backend (local development, tests, benchmarks)
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300))
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 3600))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
     """
-    Create and return a MySQL database connection.
-    Returns:
-        connection (mysql.connector.connection.MySQLConnection): MySQL connection object or None if failed.
+    Bounded pool of asyncio database connections (MySQL, or SQLite when DB_BACKEND=sqlite).
+    Idle connections are health-checked on checkout and evicted once they exceed
+    max_idle seconds unused or max_lifetime seconds since they were opened.
+    """
+
+    def __init__(self, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 max_idle=DB_POOL_MAX_IDLE, max_lifetime=DB_POOL_MAX_LIFETIME):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._slots = asyncio.Semaphore(max_size)
+        # Each idle entry is (connection, created_at, released_at)
+        self._idle = []
+        self._created_at = {}
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "acquired": 0,
+            "reused": 0,
+            "evicted_idle": 0,
+            "evicted_lifetime": 0,
+            "failed_health_checks": 0,
+            "timeouts": 0,
+        }
+
+    async def _connect(self):
+        if DB_BACKEND == 'sqlite':
+            connection = await sqlite_backend.connect()
+        else:
+            connection = await aiomysql.connect(
+                host=os.getenv('DB_HOST'),
+                port=int(os.getenv('DB_PORT', 3306)),
+                user=os.getenv('DB_USER'),
+                password=os.getenv('DB_PASSWORD'),
+                db=os.getenv('DB_NAME'),
+                autocommit=False
+            )
+        self._created_at[id(connection)] = time.monotonic()
+        self._stats["created"] += 1
+        return connection
+
+    def _close(self, conn, reason=None):
+        self._created_at.pop(id(conn), None)
+        self._stats["closed"] += 1
+        if reason:
+            self._stats[reason] += 1
+        conn.close()
+
+    async def _is_healthy(self, conn):
+        try:
+            await conn.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    async def acquire(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        conn = None
+        try:
+            while self._idle:
+                conn, created_at, released_at = self._idle.pop()
+                now = time.monotonic()
+                if now - created_at > self.max_lifetime:
+                    self._close(conn, "evicted_lifetime")
+                elif now - released_at > self.max_idle:
+                    self._close(conn, "evicted_idle")
+                elif not await self._is_healthy(conn):
+                    self._close(conn, "failed_health_checks")
+                else:
+                    self._stats["acquired"] += 1
+                    self._stats["reused"] += 1
+                    return conn
+                conn = None
+            conn = await self._connect()
+            self._stats["acquired"] += 1
+            return conn
+        except BaseException:
+            # Cancelled mid health check: the popped connection is in an unknown state
+            if conn is not None:
+                self._close(conn, "failed_health_checks")
+            self._slots.release()
+            raise
+
+    async def release(self, conn):
+        try:
+            if conn.closed:
+                self._close(conn, "failed_health_checks")
+                return
+            # Never hand the next request a half-finished transaction
+            if conn.get_transaction_status():
+                await conn.rollback()
+            created_at = self._created_at.get(id(conn), time.monotonic())
+            if time.monotonic() - created_at > self.max_lifetime:
+                self._close(conn, "evicted_lifetime")
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+        except Error:
+            self._close(conn, "failed_health_checks")
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        idle = len(self._idle)
+        open_connections = len(self._created_at)
+        return {
+            "max_size": self.max_size,
+            "open": open_connections,
+            "idle": idle,
+            "in_use": open_connections - idle,
+            **self._stats,
+        }
+
+
+pool = ConnectionPool()
+
+
+@asynccontextmanager
+async def pooled_connection():
+    """
+    Check a connection out of the pool for the duration of the async with-block.
+    """
+    conn = await pool.acquire()
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+async def get_db():
+    """
+    FastAPI dependency yielding a pooled connection that is returned to the pool when the request ends.
     """
     try:
-        connection = connector.connect(
-            host=os.getenv('DB_HOST'),
-            port=int(os.getenv('DB_PORT', 3306)),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME')
-        )
-        if connection.is_connected():
-            print('Connected to MySQL database')
-            return connection
+        conn = await pool.acquire()
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Database busy, please retry")
     except Error as e:
-        print(f"Error connecting to MySQL: {e}")
-    return None
+        print(f"Error connecting to the database: {e}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
 
-def initialize_schema():
+
+async def initialize_schema():
     """
-    Create the finance schema with required tables if they do not exist.
+    Bring the database schema up to date by applying any pending migrations.
+    SQLite databases are created at the latest schema instead.
     """
-    conn = create_mysql_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            for statement in SCHEMA_SQL.strip().split(';'):
-                if statement.strip():
-                    cursor.execute(statement)
-            conn.commit()
-            print('Database schema initialized.')
-        except Exception as e:
-            print(f"Error initializing schema: {e}")
-        finally:
-            cursor.close()
-            conn.close()
\ No newline at end of file
+    try:
+        async with pooled_connection() as conn:
+            if DB_BACKEND == 'sqlite':
+                await sqlite_backend.create_schema(conn)
+                return
+            applied = await run_migrations(conn)
+        if applied:
+            print(f'Database schema migrated to version {applied[-1]}.')
+    except Exception as e:
+        print(f"Error initializing schema: {e}")
@@ -0,0 +1,86 @@
+import os
+from collections import defaultdict
+from datetime import date
+import numpy as np
+from app.schedules import cents, monthly_dates, schedule_arrays
+
+# --- Cash-flow forecast ---
+# Projects each account's daily balance from today's balance plus the flows we can anticipate:
+#   - income that recurred in at least FORECAST_MIN_OCCURRENCES distinct months of the last
+#     FORECAST_LOOKBACK_MONTHS, repeated monthly on the day and amount of its latest occurrence
+#   - monthly payments, every month on their due_date's day from due_date on
+#   - installment payments, from their schedules
+#   - credit card balances, paid from the card's account on the card's next due date
+# Every flow becomes an (account, day, cents) event; the events are summed into an
+# accounts x days grid and accumulated along the day axis in one pass.
+
+FORECAST_LOOKBACK_MONTHS = int(os.getenv("FORECAST_LOOKBACK_MONTHS", 6))
+FORECAST_MIN_OCCURRENCES = int(os.getenv("FORECAST_MIN_OCCURRENCES", 2))
+
+
+def _monthly(start, months, anchor, after=None):
+    """
+    Monthly dates on anchor's day of month within the horizon, none before anchor (or on/before after).
+    """
+    dates = monthly_dates(start, months + 1, anchor.day)
+    floor = np.datetime64(after, "D") + 1 if after is not None else np.datetime64(anchor, "D")
+    return dates[dates >= max(floor, np.datetime64(start, "D"))]
+
+
+def recurring_income(rows):
+    """
+    (account_id, anchor_date, cents) for each income source that looks monthly.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["account_id"], row["source"])].append(row)
+    recurring = []
+    for (account_id, _), occurrences in groups.items():
+        if len({(r["date"].year, r["date"].month) for r in occurrences}) < FORECAST_MIN_OCCURRENCES:
+            continue
+        latest = max(occurrences, key=lambda r: r["date"])
+        recurring.append((account_id, latest["date"], cents(latest["amount"])))
+    return recurring
+
+
+def forecast(accounts, income, payments, installments, cards, months, start=None):
+    """
+    Daily balance projection. Returns (start, account_ids, balances) where balances is an
+    accounts x days array of cents and column 0 is the end of `start`.
+    """
+    start = start or date.today()
+    first_day = np.datetime64(start, "D")
+    # Through the same day `months` months later
+    days = int((monthly_dates(start, months + 1, start.day)[-1] - first_day).astype(np.int64)) + 1
+    account_ids = [row["id"] for row in accounts]
+    index = {account_id: i for i, account_id in enumerate(account_ids)}
+    event_accounts, event_dates, event_amounts = [], [], []
+
+    def add(account_id, dates, amounts):
+        if account_id in index and len(dates):
+            event_accounts.append(np.full(len(dates), index[account_id], dtype=np.int64))
+            event_dates.append(dates)
+            event_amounts.append(np.broadcast_to(np.asarray(amounts, dtype=np.int64), len(dates)))
+
+    for account_id, anchor, amount in recurring_income(income):
+        add(account_id, _monthly(start, months, anchor, after=anchor), amount)
+    for row in payments:
+        if row["due_date"] is not None:
+            add(row["account_id"], _monthly(start, months, row["due_date"]), -cents(row["amount"]))
+    for row in installments:
+        dates, amounts, _ = schedule_arrays(row)
+        add(row["account_id"], dates, -amounts)
+    for row in cards:
+        if row["due_date"] is not None and row["balance"]:
+            # Only the current statement is known: pay it on the next occurrence of the due day
+            add(row["account_id"], _monthly(start, months, row["due_date"])[:1], -cents(row["balance"]))
+
+    opening = np.array([cents(row["balance"] or 0) for row in accounts], dtype=np.int64)
+    flows = np.zeros((len(account_ids), days), dtype=np.int64)
+    if event_dates:
+        rows = np.concatenate(event_accounts)
+        cols = (np.concatenate(event_dates) - first_day).astype(np.int64)
+        amounts = np.concatenate(event_amounts)
+        in_range = (cols >= 0) & (cols < days)
+        np.add.at(flows, (rows[in_range], cols[in_range]), amounts[in_range])
+    return start, account_ids, opening[:, None] + np.cumsum(flows, axis=1)
@@ -0,0 +1,136 @@
+import os
+import hashlib
+from datetime import date
+from fastapi import HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from app.cache import TTLCache
+from app.database import pooled_connection, PoolTimeout, Error
+from app.auth import get_current_user
+
+# --- Conditional GET and per-user response caching ---
+# Every user has a data_version counter that is bumped after any successful (2xx) write to the cached
+# routers. A GET reads the counter first, so its ETag (user, version, URL) is strong: the body
+# can only change once the version does. Matching If-None-Match gets a 304 without running the
+# handler, and JSON bodies are kept in an in-process LRU keyed by the same version. The counter
+# lives in the database, so writes on one worker invalidate the caches of every other worker.
+# Jobs that write outside the API bump it themselves with bump_data_versions(), and a handler
+# that commits before failing calls bump_data_version() itself.
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 2048))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+
+CACHED_PREFIXES = (
+    "/v1/accounts",
+    "/v1/credit-cards",
+    "/v1/income",
+    "/v1/transactions",
+    "/v1/monthly-payments",
+    "/v1/installments",
+    "/v1/forecast",
+    "/v1/budgets",
+)
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+CACHE_CONTROL = "private, no-cache"
+
+response_cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+async def data_version(user_id):
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT data_version FROM users WHERE id=%s", (user_id,))
+            row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def bump_data_version(user_id):
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("UPDATE users SET data_version = data_version + 1 WHERE id=%s", (user_id,))
+        await conn.commit()
+    response_cache.discard_where(lambda key, value: key[0] == user_id)
+
+
+async def bump_data_versions(cursor, where="", params=()):
+    """
+    For jobs that change users' data outside the API (rebuilds, reconcile, archive runs): bump
+    data_version for the users matching `where`, or for everyone. Commits with the caller.
+    """
+    await cursor.execute(f"UPDATE users SET data_version = data_version + 1{where}", params)
+
+
+def _etag(user_id, version, path, query):
+    # Some responses depend on today's date (schedules' paid flags, default date ranges)
+    digest = hashlib.sha1(f"{user_id}:{date.today()}:{path}?{query}".encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+async def _request_user(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        # Let the route's own auth dependency produce the 401
+        return None
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+
+    async def _write(self, request, call_next, user_id):
+        response = await call_next(request)
+        if not 200 <= response.status_code < 300:
+            # Rejected writes commit nothing, so every cached response stays valid
+            return response
+        # After the handler committed: a GET that read the old version meanwhile is
+        # cached under that version and so is never served again
+        try:
+            await bump_data_version(user_id)
+        except (PoolTimeout, Error) as e:
+            response_cache.discard_where(lambda key, value: key[0] == user_id)
+            print(f"Error bumping data version for user {user_id}: {e}")
+        return response
+
+    async def dispatch(self, request, call_next):
+        if not request.url.path.startswith(CACHED_PREFIXES):
+            return await call_next(request)
+        if request.method not in WRITE_METHODS and request.method != "GET":
+            return await call_next(request)
+        # Only the lookups fall back to the uncached path; the handler itself runs exactly once
+        try:
+            user = await _request_user(request)
+            version = None if user is None or request.method != "GET" else await data_version(user["id"])
+        except (PoolTimeout, Error):
+            return await call_next(request)
+        if user is None:
+            return await call_next(request)
+        if request.method in WRITE_METHODS:
+            return await self._write(request, call_next, user["id"])
+
+        key = (user["id"], date.today(), request.url.path, request.url.query)
+        etag = _etag(user["id"], version, request.url.path, request.url.query)
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        cached = response_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return Response(cached[1], headers=cached[2])
+
+        response = await call_next(request)
+        # Streaming exports and event streams are never buffered
+        if response.status_code != 200 or response.headers.get("content-type") != "application/json":
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+        headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        response_cache.set(key, (version, body, headers))
+        return Response(body, status_code=200, headers=headers)
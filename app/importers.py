@@ -0,0 +1,96 @@
+import csv
+import json
+import re
+import codecs
+
+# --- Streaming parsers for bulk transaction uploads ---
+# Each parser consumes an async iterator of raw body chunks and yields (row_number, dict)
+# one record at a time, so an upload is never held in memory as a whole. Bodies are decoded
+# incrementally, so a character split across chunks survives; invalid bytes raise
+# UnicodeDecodeError rather than being replaced.
+
+CSV_COLUMNS = ("account_id", "amount", "date", "description", "category", "currency")
+
+_OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+_OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+async def iter_text(chunks, encoding="utf-8"):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    async for chunk in chunks:
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_lines(chunks, encoding="utf-8"):
+    buffer = ""
+    async for text in iter_text(chunks, encoding):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+async def iter_csv(chunks):
+    header = None
+    pending = ""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        # A quoted field may contain newlines; keep joining until the quotes balance
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_number += 1
+        yield row_number, {name: (value.strip() or None) for name, value in zip(header, values)}
+    if pending:
+        row_number += 1
+        yield row_number, {"_error": "Unterminated quoted field"}
+
+
+async def iter_ndjson(chunks):
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, {"_error": f"Invalid JSON: {e}"}
+
+
+async def iter_ofx(chunks):
+    buffer = ""
+    row_number = 0
+    async for text in iter_text(chunks):
+        buffer += text
+        end = 0
+        for match in _OFX_TRANSACTION.finditer(buffer):
+            row_number += 1
+            yield row_number, _ofx_record(match.group(1))
+            end = match.end()
+        buffer = buffer[end:]
+
+
+def _ofx_record(block):
+    fields = {tag.upper(): value.strip() for tag, value in _OFX_FIELD.findall(block)}
+    posted = fields.get("DTPOSTED", "")
+    return {
+        "amount": fields.get("TRNAMT"),
+        "date": f"{posted[0:4]}-{posted[4:6]}-{posted[6:8]}" if len(posted) >= 8 else None,
+        "description": fields.get("NAME") or fields.get("MEMO"),
+        "category": None,
+    }
@@ -1,7 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import accounts, credit_cards, income, transactions, monthly_payments, installments, notifications, login
-from app.database import initialize_schema
+from app.routers import accounts, credit_cards, income, transactions, monthly_payments, installments, notifications, login, dashboard, forecast, budgets, attachments
+from app.database import initialize_schema, pool
+from app.routers.login import user_cache
+from app import passwords, notifier, pubsub
+from app.pagination import NEXT_CURSOR_HEADER
+from app.http_cache import ResponseCacheMiddleware, response_cache
 
 app = FastAPI(
     title="Finance Notification System API",
@@ -13,6 +17,9 @@ app = FastAPI(
     }
 )
 
+# Conditional GET / response cache; added before CORS so cached responses still get CORS headers
+app.add_middleware(ResponseCacheMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -20,19 +27,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
-# Initialize schema at startup (optional, can be commented out after first run)
+# Apply pending schema migrations at startup (a no-op once the database is current)
 @app.on_event("startup")
-def on_startup():
-    initialize_schema()
+async def on_startup():
+    await initialize_schema()
+    notifier.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await notifier.stop()
+    pool.close_all()
+    passwords.shutdown()
+
+@app.get("/v1/health", tags=["Health"])
+async def health():
+    return {"status": "ok", "db_pool": pool.stats(), "auth_cache": user_cache.stats(), "response_cache": response_cache.stats(), "password_pool": passwords.stats(), "pubsub": pubsub.broker.stats()}
 
 # API versioning
 app.include_router(accounts.router, prefix="/v1/accounts", tags=["Accounts"])
 app.include_router(credit_cards.router, prefix="/v1/credit-cards", tags=["Credit Cards"])
 app.include_router(income.router, prefix="/v1/income", tags=["Income"])
 app.include_router(transactions.router, prefix="/v1/transactions", tags=["Transactions"])
+app.include_router(attachments.router, prefix="/v1/transactions", tags=["Attachments"])
 app.include_router(monthly_payments.router, prefix="/v1/monthly-payments", tags=["Monthly Payments"])
 app.include_router(installments.router, prefix="/v1/installments", tags=["Installments"])
+app.include_router(budgets.router, prefix="/v1/budgets", tags=["Budgets"])
 app.include_router(notifications.router, prefix="/v1/notifications", tags=["Notifications"])
+app.include_router(dashboard.router, prefix="/v1/dashboard", tags=["Dashboard"])
+app.include_router(forecast.router, prefix="/v1/forecast", tags=["Forecast"])
 app.include_router(login.router, prefix="/v1/login", tags=["Login"])
\ No newline at end of file
@@ -0,0 +1,196 @@
+import asyncio
+from functools import partial
+from aiomysql import ProgrammingError
+from app.schemas import SCHEMA_SQL
+from app import rollups, balances, budgets, archive
+
+# --- Versioned schema migrations ---
+# Each migration is (version, name, steps). A step is either a SQL statement or an
+# async callable taking a cursor, for changes that must inspect the live schema first.
+# Versions are applied in order and recorded in schema_version, so startup only runs
+# DDL for migrations this database has not seen yet.
+
+MIGRATION_LOCK = "finance_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 60
+
+NO_SUCH_TABLE = 1146
+
+SCHEMA_VERSION_SQL = '''
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+# Named leases let one of several workers own a background job at a time (see app.notifier)
+JOB_LEASES_SQL = '''
+CREATE TABLE IF NOT EXISTS job_leases (
+    name VARCHAR(100) PRIMARY KEY,
+    owner VARCHAR(150) NOT NULL,
+    expires_at DATETIME NOT NULL
+)
+'''
+
+
+async def column_exists(cursor, table, column):
+    await cursor.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return await cursor.fetchone() is not None
+
+
+async def index_exists(cursor, table, index):
+    await cursor.execute(
+        "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, index)
+    )
+    return await cursor.fetchone() is not None
+
+
+def add_column(table, column, definition):
+    async def step(cursor):
+        if not await column_exists(cursor, table, column):
+            await cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+def create_index(table, index, columns, kind="INDEX"):
+    async def step(cursor):
+        if not await index_exists(cursor, table, index):
+            await cursor.execute(f"CREATE {kind} {index} ON {table} ({columns})")
+    return step
+
+
+async def seed_opening_balances(cursor):
+    # The stored balance so far was a client-set figure; keep it as the opening balance
+    if not await column_exists(cursor, "accounts", "opening_balance"):
+        await cursor.execute("ALTER TABLE accounts ADD COLUMN opening_balance DECIMAL(15,2) NOT NULL DEFAULT 0.00")
+        await cursor.execute("UPDATE accounts SET opening_balance = COALESCE(balance, 0)")
+
+
+# Rows owned through an account; they carry a copy of the account's user_id from migration 10 on
+ACCOUNT_OWNED_TABLES = ("transactions", "income", "installments", "monthly_payments", "credit_cards")
+
+
+async def backfill_user_ids(cursor):
+    for table in ACCOUNT_OWNED_TABLES:
+        await cursor.execute(f"UPDATE {table} r JOIN accounts a ON r.account_id = a.id SET r.user_id = a.user_id WHERE r.user_id IS NULL")
+    # Payment notifications belong to the payment's owner, budget notifications to the budget's
+    await cursor.execute("UPDATE notifications n JOIN monthly_payments mp ON n.monthly_payment_id = mp.id SET n.user_id = mp.user_id WHERE n.user_id IS NULL")
+    await cursor.execute("UPDATE notifications n JOIN budgets b ON n.budget_id = b.id SET n.user_id = b.user_id WHERE n.user_id IS NULL")
+
+
+# The baseline tables are a fixed constant without string literals containing ';'
+BASELINE = [statement.strip() for statement in SCHEMA_SQL.split(';') if statement.strip()]
+
+MIGRATIONS = [
+    (1, "baseline tables", BASELINE),
+    (2, "indexes for list query shapes", [
+        # accounts are always filtered by owner; older databases predate the column
+        add_column("accounts", "user_id", "INT NULL"),
+        create_index("accounts", "idx_accounts_user_id", "user_id, id"),
+        create_index("transactions", "idx_transactions_account_date", "account_id, date, id"),
+        create_index("transactions", "idx_transactions_account_category_date", "account_id, category, date, id"),
+        create_index("income", "idx_income_account_date", "account_id, date, id"),
+        create_index("installments", "idx_installments_account_start", "account_id, start_date, id"),
+        create_index("monthly_payments", "idx_monthly_payments_account_due", "account_id, due_date, id"),
+        create_index("monthly_payments", "idx_monthly_payments_due", "due_date, id"),
+        create_index("credit_cards", "idx_credit_cards_account", "account_id, id"),
+        create_index("budgets", "idx_budgets_user", "user_id, id"),
+    ]),
+    # The archive tables only exist from migration 11; before that the live tables are the whole ledger
+    (3, "transaction spending rollups", rollups.ROLLUP_TABLES_SQL + [partial(rollups.rebuild, archived=False)]),
+    (4, "ledger-maintained account balances", [seed_opening_balances, partial(balances.recompute_all, archived=False)]),
+    (5, "scheduled due payment notifications", [
+        add_column("notifications", "cycle", "DATE NULL"),
+        create_index("notifications", "uq_notifications_payment_cycle", "monthly_payment_id, cycle", kind="UNIQUE INDEX"),
+        JOB_LEASES_SQL,
+    ]),
+    (6, "full-text search indexes", [
+        # Column lists must match the MATCH() lists in the routers' SEARCH_COLUMNS
+        create_index("transactions", "ft_transactions_text", "description, category", kind="FULLTEXT INDEX"),
+        create_index("income", "ft_income_source", "source", kind="FULLTEXT INDEX"),
+        create_index("installments", "ft_installments_description", "description", kind="FULLTEXT INDEX"),
+        create_index("monthly_payments", "ft_monthly_payments_description", "description", kind="FULLTEXT INDEX"),
+    ]),
+    (7, "per-user data version for response caching", [
+        add_column("users", "data_version", "BIGINT UNSIGNED NOT NULL DEFAULT 0"),
+    ]),
+    (8, "budget spend tracking", budgets.BUDGET_TABLES_SQL + [
+        add_column("notifications", "budget_id", "INT NULL"),
+        create_index("notifications", "idx_notifications_budget", "budget_id, cycle"),
+        budgets.rebuild,
+    ]),
+    (9, "content-addressed attachments", [
+        add_column("attachments", "size", "BIGINT NULL"),
+        add_column("attachments", "content_type", "VARCHAR(100) NULL"),
+        create_index("attachments", "idx_attachments_file_path", "file_path"),
+    ]),
+    (10, "denormalised owner ids", [
+        *[add_column(table, "user_id", "INT NULL") for table in ACCOUNT_OWNED_TABLES + ("notifications",)],
+        backfill_user_ids,
+        create_index("transactions", "idx_transactions_user_date", "user_id, date, id"),
+        create_index("income", "idx_income_user_date", "user_id, date, id"),
+        create_index("installments", "idx_installments_user_start", "user_id, start_date, id"),
+        create_index("monthly_payments", "idx_monthly_payments_user_due", "user_id, due_date, id"),
+        create_index("credit_cards", "idx_credit_cards_user", "user_id, id"),
+        create_index("notifications", "idx_notifications_user", "user_id, id"),
+    ]),
+    (11, "year-partitioned archive tables", archive.ARCHIVE_TABLES_SQL),
+    # Spend tracked before this version swapped the monthly and yearly period starts
+    (12, "rebuild budget spend", [budgets.rebuild]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def current_version(cursor):
+    try:
+        await cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    except ProgrammingError as e:
+        if e.args[0] != NO_SUCH_TABLE:
+            raise
+        return None
+    return (await cursor.fetchone())[0]
+
+
+async def run_migrations(conn):
+    """
+    Apply pending migrations on conn. Returns the list of versions applied.
+    A MySQL named lock keeps concurrently starting workers from racing each other.
+    """
+    async with conn.cursor() as cursor:
+        version = await current_version(cursor)
+        if version == LATEST_VERSION:
+            return []
+        await cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if (await cursor.fetchone())[0] != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            if version is None:
+                await cursor.execute(SCHEMA_VERSION_SQL)
+            # Another worker may have migrated while we waited for the lock
+            version = await current_version(cursor) or 0
+            applied = []
+            for number, name, steps in MIGRATIONS:
+                if number <= version:
+                    continue
+                for step in steps:
+                    if callable(step):
+                        await step(cursor)
+                    else:
+                        await cursor.execute(step)
+                await cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (number, name))
+                await conn.commit()
+                applied.append(number)
+            return applied
+        finally:
+            await cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            await cursor.fetchone()
+
+
+if __name__ == "__main__":
+    from app.database import initialize_schema
+    asyncio.run(initialize_schema())
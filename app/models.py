@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+import datetime
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 class Account(BaseModel):
@@ -7,6 +8,7 @@ class Account(BaseModel):
     type: Optional[str]
     balance: Optional[float] = 0.0
     currency: Optional[str] = 'USD'
+    opening_balance: Optional[float] = None
 
 class CreditCard(BaseModel):
     id: Optional[int]
@@ -32,6 +34,23 @@ class Transaction(BaseModel):
     category: Optional[str]
     currency: Optional[str] = 'USD'
 
+class TransactionImportRow(BaseModel):
+    account_id: int
+    amount: float
+    date: datetime.date
+    description: Optional[str] = Field(None, max_length=255)
+    category: Optional[str] = Field(None, max_length=100)
+    currency: Optional[str] = Field('USD', max_length=10)
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+
 class MonthlyPayment(BaseModel):
     id: Optional[int]
     account_id: Optional[int]
@@ -50,10 +69,12 @@ class Installment(BaseModel):
 
 class Notification(BaseModel):
     id: Optional[int]
-    monthly_payment_id: int
+    monthly_payment_id: Optional[int]
     message: str
     notified_at: Optional[str]
     is_read: Optional[bool] = False
+    cycle: Optional[str] = None
+    budget_id: Optional[int] = None
 
 class User(BaseModel):
     id: Optional[int]
@@ -71,6 +92,11 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class PasswordChange(BaseModel):
+    username: str
+    old_password: str
+    new_password: str
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -80,7 +106,7 @@ class TokenData(BaseModel):
 
 class Budget(BaseModel):
     id: Optional[int]
-    user_id: int
+    user_id: Optional[int] = None
     account_id: Optional[int]
     category: Optional[str]
     amount: float
@@ -88,10 +114,21 @@ class Budget(BaseModel):
     currency: str = 'USD'
     created_at: Optional[str]
 
+class BudgetStatus(BaseModel):
+    budget_id: int
+    period: str
+    period_start: datetime.date
+    amount: float
+    spent: float
+    remaining: float
+    over_budget: bool
+
 class Attachment(BaseModel):
     id: Optional[int]
     user_id: int
     transaction_id: int
     file_name: str
     file_path: str
-    uploaded_at: Optional[str]
\ No newline at end of file
+    uploaded_at: Optional[str]
+    size: Optional[int] = None
+    content_type: Optional[str] = None
\ No newline at end of file
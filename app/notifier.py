@@ -0,0 +1,164 @@
+import os
+import sys
+import socket
+import asyncio
+import uuid
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+
+from datetime import date, timedelta
+from app.database import pooled_connection, DictCursor
+from app.schedules import next_occurrence
+from app import pubsub
+
+# --- Background generator for due monthly payment notifications ---
+# Every NOTIFY_INTERVAL seconds one worker (whichever holds the DB lease) walks the
+# monthly_payments that have started and inserts one notification per payment per cycle, for
+# the cycles falling within NOTIFY_LEAD_DAYS. A payment recurs monthly on its due_date's day
+# from due_date on (as in the forecast), so its cycle is the next occurrence of that day. The
+# unique (monthly_payment_id, cycle) key makes the insert idempotent, so a lease handover
+# mid-scan can never double-fire.
+
+NOTIFY_SCHEDULER = os.getenv("NOTIFY_SCHEDULER", "1") != "0"
+NOTIFY_INTERVAL = float(os.getenv("NOTIFY_INTERVAL", 300))
+NOTIFY_LEAD_DAYS = int(os.getenv("NOTIFY_LEAD_DAYS", 3))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 500))
+
+LEASE_NAME = "due_payment_notifications"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_task = None
+
+
+async def acquire_lease(conn, name, seconds):
+    """
+    Take or renew the named lease for this worker. Returns True if we hold it afterwards.
+    The second IF repeats the first's test, so it holds whether owner reads as just assigned
+    (MySQL) or as it was (SQLite).
+    """
+    async with conn.cursor() as cursor:
+        await cursor.execute('''
+            INSERT INTO job_leases (name, owner, expires_at) VALUES (%s, %s, DATE_ADD(NOW(), INTERVAL %s SECOND))
+            ON DUPLICATE KEY UPDATE
+                owner = IF(expires_at < NOW() OR owner = VALUES(owner), VALUES(owner), owner),
+                expires_at = IF(expires_at < NOW() OR owner = VALUES(owner), VALUES(expires_at), expires_at)
+        ''', (name, WORKER_ID, int(seconds)))
+        await cursor.execute("SELECT owner FROM job_leases WHERE name=%s", (name,))
+        row = await cursor.fetchone()
+    await conn.commit()
+    return row is not None and row[0] == WORKER_ID
+
+
+async def release_lease(conn, name):
+    async with conn.cursor() as cursor:
+        await cursor.execute("DELETE FROM job_leases WHERE name=%s AND owner=%s", (name, WORKER_ID))
+    await conn.commit()
+
+
+def _message(payment, cycle):
+    description = payment["description"] or "Monthly payment"
+    return f"{description} of {float(payment['amount']):.2f} is due on {cycle.isoformat()}"
+
+
+async def _existing_cycles(cursor, keys):
+    payment_ids = sorted({payment_id for payment_id, _ in keys})
+    cycles = sorted({cycle for _, cycle in keys})
+    await cursor.execute(f'''
+        SELECT * FROM notifications
+        WHERE monthly_payment_id IN ({", ".join(["%s"] * len(payment_ids))}) AND cycle IN ({", ".join(["%s"] * len(cycles))})
+    ''', (*payment_ids, *cycles))
+    return {(row["monthly_payment_id"], row["cycle"]): row for row in await cursor.fetchall()}
+
+
+async def generate_due_notifications(lead_days=NOTIFY_LEAD_DAYS, batch_size=NOTIFY_BATCH_SIZE):
+    """
+    Create missing notifications for payments whose current cycle falls in the next lead_days days.
+    Returns the number of notifications created, or None if another worker holds the lease.
+    """
+    lease_seconds = max(NOTIFY_INTERVAL * 2, 60)
+    async with pooled_connection() as conn:
+        if not await acquire_lease(conn, LEASE_NAME, lease_seconds):
+            return None
+        today = date.today()
+        horizon = today + timedelta(days=lead_days)
+        created = 0
+        last_id = 0
+        while True:
+            new_rows = []
+            async with conn.cursor(DictCursor) as cursor:
+                await cursor.execute('''
+                    SELECT id, user_id, amount, due_date, description FROM monthly_payments
+                    WHERE due_date <= %s AND id > %s ORDER BY id LIMIT %s
+                ''', (horizon, last_id, batch_size))
+                payments = await cursor.fetchall()
+                due = {}
+                for payment in payments:
+                    cycle = next_occurrence(payment["due_date"], today)
+                    if cycle <= horizon:
+                        due[(payment["id"], cycle)] = payment
+                if due:
+                    existing = await _existing_cycles(cursor, due)
+                    missing = [key for key in due if key not in existing]
+                    if missing:
+                        await cursor.executemany(
+                            "INSERT INTO notifications (user_id, monthly_payment_id, cycle, message) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE id = id",
+                            [(due[key]["user_id"], *key, _message(due[key], key[1])) for key in missing]
+                        )
+                        # Selected by key, not by id: rows other writers commit meanwhile are not ours to publish
+                        inserted = await _existing_cycles(cursor, missing)
+                        new_rows = [inserted[key] for key in missing if key in inserted]
+                        created += len(new_rows)
+            await conn.commit()
+            for row in new_rows:
+                await pubsub.publish_notification(row.pop("user_id"), row)
+            if len(payments) < batch_size:
+                break
+            last_id = payments[-1]["id"]
+            # Keep the lease alive on long scans; stop if it was taken over
+            if not await acquire_lease(conn, LEASE_NAME, lease_seconds):
+                break
+        return created
+
+
+async def run_forever(interval=NOTIFY_INTERVAL):
+    while True:
+        try:
+            created = await generate_due_notifications()
+            if created:
+                print(f"Created {created} due payment notification(s).")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error generating notifications: {e}")
+        await asyncio.sleep(interval)
+
+
+def start():
+    global _task
+    if NOTIFY_SCHEDULER and _task is None:
+        _task = asyncio.get_running_loop().create_task(run_forever())
+
+
+async def stop():
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    try:
+        async with pooled_connection() as conn:
+            await release_lease(conn, LEASE_NAME)
+    except Exception as e:
+        print(f"Error releasing notification lease: {e}")
+
+
+if __name__ == "__main__":
+    # Standalone worker: python -m app.notifier [--once]
+    if "--once" in sys.argv[1:]:
+        print(asyncio.run(generate_due_notifications()))
+    else:
+        asyncio.run(run_forever())
@@ -0,0 +1,96 @@
+from fastapi import HTTPException
+
+# --- Ownership-scoped writes ---
+# Every owned table carries user_id: accounts by definition, child rows copied from their account
+# when written (scoped_insert). scoped_update() and scoped_delete() put that ownership into the
+# UPDATE/DELETE itself, so the check and the write are one statement with no window between them.
+# Only when nothing matched does a follow-up read tell a missing row (404) from someone else's (403).
+# Ownership is a user_id predicate on the row itself, plus a correlated EXISTS on the destination
+# account when a row moves; there is no multi-table join. The single round-trip applies to accounts,
+# credit cards, installments and monthly payments: transactions and income still take a locked read
+# first, because their balance, rollup and budget deltas need the values being replaced.
+
+
+def owner_scope(user_id, account_id=None, account_column="account_id"):
+    """
+    WHERE clause and params for the user's rows, narrowed to one account when account_id is given.
+    account_column names the column holding the account id ("id" for the accounts table itself).
+    """
+    if account_id is None:
+        return "user_id = %s", (user_id,)
+    return f"user_id = %s AND {account_column} = %s", (user_id, account_id)
+
+
+async def _check_account(cursor, account_id, user_id):
+    await cursor.execute("SELECT user_id FROM accounts WHERE id = %s", (account_id,))
+    account = await cursor.fetchone()
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if account[0] != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to use this account")
+
+
+async def check_owned(cursor, table, row_id, user_id, label, account_id=None):
+    """
+    Raise 404 if the row does not exist and 403 if it, or account_id when given, belongs to someone else.
+    """
+    await cursor.execute(f"SELECT user_id FROM {table} WHERE id = %s", (row_id,))
+    row = await cursor.fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    if row[0] != user_id:
+        raise HTTPException(status_code=403, detail=f"Not authorized to modify this {label.lower()}")
+    if account_id is not None:
+        await _check_account(cursor, account_id, user_id)
+
+
+async def raise_not_owned(cursor, table, row_id, user_id, label):
+    """
+    For a user-scoped read that found nothing: raise 404 or 403 as appropriate.
+    """
+    await check_owned(cursor, table, row_id, user_id, label)
+    raise HTTPException(status_code=404, detail=f"{label} not found")
+
+
+async def scoped_insert(cursor, table, values, user_id):
+    """
+    Insert values (column -> value) with user_id copied from values["account_id"], provided that
+    account is the user's. Returns the new row id.
+    """
+    columns = ", ".join([*values, "user_id"])
+    placeholders = ", ".join(["%s"] * len(values))
+    await cursor.execute(
+        f"INSERT INTO {table} ({columns}) SELECT {placeholders}, user_id FROM accounts WHERE id = %s AND user_id = %s",
+        (*values.values(), values["account_id"], user_id)
+    )
+    if not cursor.rowcount:
+        await _check_account(cursor, values["account_id"], user_id)
+    return cursor.lastrowid
+
+
+async def scoped_update(cursor, table, row_id, user_id, values, label):
+    """
+    Set values (column -> value) on the row if the user owns it. When values moves the row to
+    another account, that account must be theirs too. Returns whether anything changed.
+    """
+    params = [*values.values(), row_id, user_id]
+    destination = ""
+    if "account_id" in values and table != "accounts":
+        # Moving between accounts keeps user_id, since both must belong to the same user
+        destination = " AND EXISTS (SELECT 1 FROM accounts dest WHERE dest.id = %s AND dest.user_id = %s)"
+        params.extend([values["account_id"], user_id])
+    assignments = ", ".join(f"{column}=%s" for column in values)
+    await cursor.execute(f"UPDATE {table} SET {assignments} WHERE id = %s AND user_id = %s{destination}", tuple(params))
+    if cursor.rowcount:
+        return True
+    # Nothing changed: either the values were already current, or the write was not allowed
+    await check_owned(cursor, table, row_id, user_id, label, values.get("account_id") if table != "accounts" else None)
+    return False
+
+
+async def scoped_delete(cursor, table, row_id, user_id, label):
+    await cursor.execute(f"DELETE FROM {table} WHERE id = %s AND user_id = %s", (row_id, user_id))
+    if cursor.rowcount:
+        return True
+    await check_owned(cursor, table, row_id, user_id, label)
+    return False
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import date, datetime
+from fastapi import HTTPException, Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Shared query parameter for list endpoints; aliased so handlers can keep `cursor` for the DB cursor
+CursorParam = Query(None, alias="cursor", description=f"Opaque token from the {NEXT_CURSOR_HEADER} header of the previous page; takes precedence over offset")
+
+
+def encode_cursor(*values) -> str:
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+def keyset_condition(token: str, id_column: str, sort_column: str = None, nullable: bool = False):
+    """
+    Build the WHERE fragment selecting rows after the cursor for
+    ORDER BY sort_column DESC, id_column DESC (or id_column DESC alone).
+    MySQL sorts NULLs last in descending order, so a nullable sort_column is handled explicitly.
+    """
+    if sort_column is None:
+        (last_id,) = decode_cursor(token, 1)
+        return f"{id_column} < %s", [last_id]
+    last_sort, last_id = decode_cursor(token, 2)
+    if last_sort is None:
+        return f"({sort_column} IS NULL AND {id_column} < %s)", [last_id]
+    clause = f"{sort_column} < %s OR ({sort_column} = %s AND {id_column} < %s)"
+    if nullable:
+        clause += f" OR {sort_column} IS NULL"
+    return f"({clause})", [last_sort, last_sort, last_id]
+
+
+def set_next_cursor(response, rows, limit: int, sort_key: str = None):
+    """
+    Advertise the cursor for the following page when this page came back full.
+    """
+    if len(rows) < limit:
+        return
+    last = rows[-1]
+    token = encode_cursor(last["id"]) if sort_key is None else encode_cursor(last[sort_key], last["id"])
+    response.headers[NEXT_CURSOR_HEADER] = token
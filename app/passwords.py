@@ -0,0 +1,73 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt is CPU-bound by design, so it runs in its own processes instead of the request threadpool
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", PASSWORD_WORKERS * 8))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = None
+_in_flight = 0
+_rejected = 0
+
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+    return _executor
+
+
+async def _submit(fn, *args):
+    global _in_flight, _rejected
+    if _in_flight >= PASSWORD_QUEUE_LIMIT:
+        _rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password operations in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _submit(_verify, plain_password, hashed_password)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def stats():
+    return {
+        "workers": PASSWORD_WORKERS,
+        "queue_limit": PASSWORD_QUEUE_LIMIT,
+        "in_flight": _in_flight,
+        "rejected": _rejected,
+    }
@@ -0,0 +1,85 @@
+import os
+import asyncio
+from collections import defaultdict
+
+# --- In-process publish/subscribe ---
+# Brokers expose `async publish(channel, message)` and `subscribe(channel)`, the same shape as
+# a Redis-style broker, so a shared broker can replace InProcessBroker via set_broker() when
+# running several workers. Each subscription has a bounded queue: a slow consumer never blocks
+# publishers, it is marked lagged instead and catches up from the database.
+
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", 100))
+
+
+class Subscription:
+
+    def __init__(self, broker, channel, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.broker = broker
+        self.channel = channel
+        self.queue = asyncio.Queue(max_queue)
+        self.lagged = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    async def get(self, timeout=None):
+        """
+        Next message, or None if nothing arrived within timeout seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self.published = 0
+
+    async def publish(self, channel, message):
+        self.published += 1
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.put(message)
+
+    def subscribe(self, channel, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        subscription = Subscription(self, channel, max_queue)
+        self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+
+    def stats(self):
+        return {
+            "channels": len(self._subscribers),
+            "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+            "published": self.published,
+        }
+
+
+broker = InProcessBroker()
+
+
+def set_broker(new_broker):
+    global broker
+    broker = new_broker
+
+
+def notifications_channel(user_id):
+    return f"user:{user_id}:notifications"
+
+
+async def publish_notification(user_id, notification):
+    await broker.publish(notifications_channel(user_id), notification)
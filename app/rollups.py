@@ -0,0 +1,164 @@
+import sys
+import asyncio
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from app import archive
+
+# --- Daily/monthly spending rollups ---
+# transaction_daily_totals and transaction_monthly_totals hold per-user, per-account,
+# per-category sums. Transaction writes apply signed deltas inside the same DB transaction,
+# so summaries read a handful of aggregate rows instead of the whole ledger.
+# A NULL category is stored as '' because it is part of the primary key.
+
+ROLLUP_TABLES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS transaction_daily_totals (
+        user_id INT NOT NULL,
+        account_id INT NOT NULL,
+        category VARCHAR(100) NOT NULL DEFAULT '',
+        day DATE NOT NULL,
+        amount DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+        tx_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day, account_id, category)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS transaction_monthly_totals (
+        user_id INT NOT NULL,
+        account_id INT NOT NULL,
+        category VARCHAR(100) NOT NULL DEFAULT '',
+        month DATE NOT NULL,
+        amount DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+        tx_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, month, account_id, category)
+    )
+    ''',
+]
+
+# The owning user is taken from accounts so rows land under the same user the raw query joins on
+_UPSERT_SQL = '''
+    INSERT INTO {table} (user_id, account_id, category, {period}, amount, tx_count)
+    SELECT user_id, id, %s, %s, %s, %s FROM accounts WHERE id = %s
+    ON DUPLICATE KEY UPDATE amount = amount + %s, tx_count = tx_count + %s
+'''
+UPSERT_DAILY_SQL = _UPSERT_SQL.format(table="transaction_daily_totals", period="day")
+UPSERT_MONTHLY_SQL = _UPSERT_SQL.format(table="transaction_monthly_totals", period="month")
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def transaction_delta(account_id, category, day, amount, sign=1):
+    """
+    Describe the rollup change for adding (sign=1) or removing (sign=-1) one transaction.
+    """
+    return (account_id, category or '', _as_date(day), Decimal(str(amount)) * sign, sign)
+
+
+async def apply_deltas(cursor, deltas):
+    """
+    Fold deltas into the rollup tables. Deltas hitting the same bucket are merged first,
+    so a bulk import of a month of rows becomes a few dozen upserts.
+    """
+    daily = defaultdict(lambda: [Decimal(0), 0])
+    monthly = defaultdict(lambda: [Decimal(0), 0])
+    for account_id, category, day, amount, count in deltas:
+        if account_id is None:
+            continue
+        for buckets, period in ((daily, day), (monthly, day.replace(day=1))):
+            bucket = buckets[(account_id, category, period)]
+            bucket[0] += amount
+            bucket[1] += count
+    for sql, buckets in ((UPSERT_DAILY_SQL, daily), (UPSERT_MONTHLY_SQL, monthly)):
+        rows = [
+            (category, period, amount, count, account_id, amount, count)
+            for (account_id, category, period), (amount, count) in buckets.items()
+            if amount or count
+        ]
+        if rows:
+            await cursor.executemany(sql, rows)
+
+
+def _ledger(archived):
+    if not archived:
+        return "transactions"
+    columns = "account_id, category, date, amount"
+    return f"(SELECT {columns} FROM transactions UNION ALL SELECT {columns} FROM {archive.ARCHIVED['transactions']})"
+
+
+async def rebuild(cursor, user_id=None, archived=True):
+    """
+    Recompute the rollup tables from transactions, for one user or everyone. archived includes
+    the archive table (see app.archive).
+    """
+    user_filter = " WHERE a.user_id = %s" if user_id is not None else ""
+    daily_filter = " WHERE d.user_id = %s" if user_id is not None else ""
+    params = (user_id,) if user_id is not None else None
+    for table in ("transaction_daily_totals", "transaction_monthly_totals"):
+        if user_id is None:
+            await cursor.execute(f"DELETE FROM {table}")
+        else:
+            await cursor.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+    await cursor.execute(f'''
+        INSERT INTO transaction_daily_totals (user_id, account_id, category, day, amount, tx_count)
+        SELECT a.user_id, t.account_id, COALESCE(t.category, ''), t.date, SUM(t.amount), COUNT(*)
+        FROM {_ledger(archived)} t JOIN accounts a ON t.account_id = a.id{user_filter}
+        GROUP BY a.user_id, t.account_id, COALESCE(t.category, ''), t.date
+    ''', params)
+    await cursor.execute(f'''
+        INSERT INTO transaction_monthly_totals (user_id, account_id, category, month, amount, tx_count)
+        SELECT d.user_id, d.account_id, d.category, DATE_SUB(d.day, INTERVAL DAYOFMONTH(d.day) - 1 DAY), SUM(d.amount), SUM(d.tx_count)
+        FROM transaction_daily_totals d{daily_filter}
+        GROUP BY d.user_id, d.account_id, d.category, DATE_SUB(d.day, INTERVAL DAYOFMONTH(d.day) - 1 DAY)
+    ''', params)
+
+
+def summary_query(user_id, granularity="day", start_date=None, end_date=None, account_id=None, category=None):
+    """
+    Build the per-period totals query. Buckets whose transactions were all deleted keep a
+    zero row, so HAVING drops them to match the raw GROUP BY over transactions.
+    """
+    table, period = ("transaction_monthly_totals", "month") if granularity == "month" else ("transaction_daily_totals", "day")
+    query = f"SELECT {period} AS date, SUM(amount) AS amount FROM {table} WHERE user_id = %s"
+    params = [user_id]
+    if start_date:
+        query += f" AND {period} >= %s"
+        params.append(_as_date(start_date).replace(day=1) if period == "month" else start_date)
+    if end_date:
+        query += f" AND {period} <= %s"
+        params.append(end_date)
+    if account_id:
+        query += " AND account_id = %s"
+        params.append(account_id)
+    if category is not None:
+        query += " AND category = %s"
+        params.append(category)
+    query += f" GROUP BY {period} HAVING SUM(tx_count) > 0 ORDER BY {period} ASC"
+    return query, params
+
+
+async def _main(argv):
+    from app.database import pooled_connection
+    from app.http_cache import bump_data_versions
+    if not argv or argv[0] != "rebuild":
+        print("usage: python -m app.rollups rebuild [user_id]")
+        return 2
+    user_id = int(argv[1]) if len(argv) > 1 else None
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await rebuild(cursor, user_id)
+            if user_id is None:
+                await bump_data_versions(cursor)
+            else:
+                await bump_data_versions(cursor, " WHERE id = %s", (user_id,))
+        await conn.commit()
+    print("Rollups rebuilt" + (f" for user {user_id}." if user_id is not None else "."))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
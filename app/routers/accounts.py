@@ -1,34 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from app.models import Account
-from app.database import create_mysql_connection
+from app.database import get_db, DictCursor
+from app.serialization import rows_response, row_response
 from typing import List, Optional
 from app.auth import get_current_user
+from app.ownership import scoped_update, scoped_delete, check_owned
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
+from app import archive
 
 router = APIRouter()
 
 # --- CRUD Logic & Endpoints for Accounts ---
 
 @router.post("/", response_model=int)
-def create_account(account: Account, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO accounts (name, type, balance, currency, user_id) VALUES (%s, %s, %s, %s, %s)",
-            (account.name, account.type, account.balance, account.currency, user["id"])
+async def create_account(account: Account, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            "INSERT INTO accounts (name, type, opening_balance, balance, currency, user_id) VALUES (%s, %s, %s, %s, %s, %s)",
+            (account.name, account.type, account.balance or 0, account.balance or 0, account.currency, user["id"])
         )
-        conn.commit()
+        await conn.commit()
         return cursor.lastrowid
 
 @router.get("/", response_model=List[Account])
-def get_accounts(
+async def get_accounts(
+    response: Response,
     user=Depends(get_current_user),
+    conn=Depends(get_db),
     type: Optional[str] = None,
     search: Optional[str] = None,
+    page_cursor: Optional[str] = CursorParam,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
+    async with conn.cursor(DictCursor) as cursor:
         query = "SELECT * FROM accounts WHERE user_id = %s"
         params = [user["id"]]
         if type:
@@ -37,74 +42,85 @@ def get_accounts(
         if search:
             query += " AND (name LIKE %s OR type LIKE %s)"
             params.extend([f"%{search}%", f"%{search}%"])
+        if page_cursor:
+            clause, clause_params = keyset_condition(page_cursor, "id")
+            query += " AND " + clause
+            params.extend(clause_params)
         query += " ORDER BY id DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        return [Account(**row) for row in rows]
+        params.extend([limit, 0 if page_cursor else offset])
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        set_next_cursor(response, rows, limit)
+        return rows_response(Account, rows, response)
 
 @router.get("/{account_id}", response_model=Account)
-def get_account(account_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("SELECT * FROM accounts WHERE id=%s AND user_id=%s", (account_id, user["id"]))
-        row = cursor.fetchone()
+async def get_account(account_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("SELECT * FROM accounts WHERE id=%s AND user_id=%s", (account_id, user["id"]))
+        row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Account not found")
-        return Account(**row)
+        return row_response(Account, row)
 
 @router.put("/{account_id}", response_model=bool)
-def update_account(account_id: int, account: Account, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT id FROM accounts WHERE id=%s AND user_id=%s", (account_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Account not found or not authorized")
-        cursor.execute(
-            "UPDATE accounts SET name=%s, type=%s, balance=%s, currency=%s WHERE id=%s",
-            (account.name, account.type, account.balance, account.currency, account_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
+async def update_account(account_id: int, account: Account, user=Depends(get_current_user), conn=Depends(get_db)):
+    # Fields left out of the body keep their stored values rather than the model's defaults
+    values = {"name": account.name, "type": account.type}
+    if "currency" in account.model_fields_set:
+        values["currency"] = account.currency
+    async with conn.cursor() as cursor:
+        if "balance" not in account.model_fields_set or account.balance is None:
+            updated = await scoped_update(cursor, "accounts", account_id, user["id"], values, "Account")
+        else:
+            # balance is ledger-maintained: treat a new value as a manual adjustment of the opening balance
+            # (MySQL applies single-table assignments left to right, so opening_balance sees the old balance)
+            assignments = ", ".join(f"{column}=%s" for column in values)
+            await cursor.execute(
+                f"UPDATE accounts SET {assignments}, opening_balance = opening_balance + (%s - balance), balance=%s WHERE id=%s AND user_id=%s",
+                (*values.values(), account.balance, account.balance, account_id, user["id"])
+            )
+            updated = cursor.rowcount > 0
+            if not updated:
+                await check_owned(cursor, "accounts", account_id, user["id"], "Account")
+        await conn.commit()
+        return updated
 
 @router.delete("/{account_id}", response_model=bool)
-def delete_account(account_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT id FROM accounts WHERE id=%s AND user_id=%s", (account_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Account not found or not authorized")
-        cursor.execute("DELETE FROM accounts WHERE id=%s", (account_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def delete_account(account_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        deleted = await scoped_delete(cursor, "accounts", account_id, user["id"], "Account")
+        await conn.commit()
+        return deleted
+
+def _ledger_total_sql(table, name):
+    return f"SELECT (SELECT COALESCE(SUM(amount), 0) FROM {table} WHERE account_id=%s) + (SELECT COALESCE(SUM(amount), 0) FROM {archive.ARCHIVED[table]} WHERE account_id=%s) AS {name}"
 
 @router.post("/{account_id}/manage-credit-cards-balance", response_model=dict)
-def manage_credit_cards_balance(account_id: int, user=Depends(get_current_user)):
+async def manage_credit_cards_balance(account_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
     """
     Calculate and update all credit cards' balances for the given account based on income (money in) and transactions (money out).
     Returns updated balances for each credit card.
     """
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
+    async with conn.cursor(DictCursor) as cursor:
         # Ensure ownership
-        cursor.execute("SELECT id FROM accounts WHERE id=%s AND user_id=%s", (account_id, user["id"]))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT id FROM accounts WHERE id=%s AND user_id=%s", (account_id, user["id"]))
+        if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Account not found or not authorized")
-        # Calculate money in (sum of income)
-        cursor.execute("SELECT COALESCE(SUM(amount), 0) as total_in FROM income WHERE account_id=%s", (account_id,))
-        total_in = cursor.fetchone()["total_in"]
+        # Calculate money in (sum of income, archived years included)
+        await cursor.execute(_ledger_total_sql("income", "total_in"), (account_id, account_id))
+        total_in = (await cursor.fetchone())["total_in"]
         # Calculate money out (sum of transactions)
-        cursor.execute("SELECT COALESCE(SUM(amount), 0) as total_out FROM transactions WHERE account_id=%s", (account_id,))
-        total_out = cursor.fetchone()["total_out"]
+        await cursor.execute(_ledger_total_sql("transactions", "total_out"), (account_id, account_id))
+        total_out = (await cursor.fetchone())["total_out"]
         # Net balance
         net_change = float(total_in) - float(total_out)
         # Get all credit cards for this account
-        cursor.execute("SELECT id, balance FROM credit_cards WHERE account_id=%s", (account_id,))
-        cards = cursor.fetchall()
+        await cursor.execute("SELECT id, balance FROM credit_cards WHERE account_id=%s", (account_id,))
+        cards = await cursor.fetchall()
         updated_balances = {}
         for card in cards:
             new_balance = float(card["balance"]) + net_change
-            cursor.execute("UPDATE credit_cards SET balance=%s WHERE id=%s", (new_balance, card["id"]))
+            await cursor.execute("UPDATE credit_cards SET balance=%s WHERE id=%s", (new_balance, card["id"]))
             updated_balances[card["id"]] = new_balance
-        conn.commit()
+        await conn.commit()
         return {"updated_balances": updated_balances, "money_in": total_in, "money_out": total_out}
@@ -0,0 +1,82 @@
+import os
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import FileResponse
+from app.models import Attachment
+from app.database import get_db, pooled_connection, DictCursor, IntegrityError
+from app.serialization import rows_response
+from typing import List, Optional
+from app.auth import get_current_user
+from app import attachments
+
+router = APIRouter()
+
+# --- Endpoints for transaction attachments ---
+
+async def _check_transaction(conn, tx_id, user):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT id FROM transactions WHERE id=%s AND user_id=%s", (tx_id, user["id"]))
+        if not await cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Transaction not found or not authorized")
+
+async def _get_attachment(conn, tx_id, attachment_id, user):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("SELECT * FROM attachments WHERE id=%s AND transaction_id=%s AND user_id=%s", (attachment_id, tx_id, user["id"]))
+        row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return row
+
+@router.post("/{tx_id}/attachments", response_model=int)
+async def upload_attachment(
+    tx_id: int,
+    request: Request,
+    file_name: Optional[str] = Query(None, max_length=255, description="Defaults to the start of the content hash"),
+    user=Depends(get_current_user)
+):
+    """
+    Upload the raw request body as an attachment of the transaction. The body is streamed to
+    disk in chunks; identical content is stored only once.
+    """
+    # No connection is held while the body streams in; slow uploads must not pin the pool
+    async with pooled_connection() as conn:
+        await _check_transaction(conn, tx_id, user)
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > attachments.ATTACHMENT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Attachments are limited to {attachments.ATTACHMENT_MAX_BYTES} bytes")
+    try:
+        temp_path, digest, size = await attachments.receive(request.stream())
+    except attachments.TooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    content_type = request.headers.get("content-type", "application/octet-stream").split(";")[0].strip()
+    try:
+        async with pooled_connection() as conn:
+            return await attachments.store(conn, temp_path, digest, (user["id"], tx_id, file_name or digest[:12], size, content_type))
+    except IntegrityError:
+        # The transaction was deleted while the body streamed in
+        raise HTTPException(status_code=404, detail="Transaction not found or not authorized")
+    finally:
+        attachments.discard(temp_path)
+
+@router.get("/{tx_id}/attachments", response_model=List[Attachment])
+async def get_attachments(tx_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    await _check_transaction(conn, tx_id, user)
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("SELECT * FROM attachments WHERE transaction_id=%s AND user_id=%s ORDER BY id", (tx_id, user["id"]))
+        rows = await cursor.fetchall()
+    return rows_response(Attachment, rows)
+
+@router.get("/{tx_id}/attachments/{attachment_id}")
+async def download_attachment(tx_id: int, attachment_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    """
+    Send the file; supports Range requests and lets the server use sendfile where available.
+    """
+    row = await _get_attachment(conn, tx_id, attachment_id, user)
+    path = attachments.absolute_path(row["file_path"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Attachment file is missing")
+    return FileResponse(path, media_type=row["content_type"] or "application/octet-stream", filename=row["file_name"])
+
+@router.delete("/{tx_id}/attachments/{attachment_id}", response_model=bool)
+async def delete_attachment(tx_id: int, attachment_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    row = await _get_attachment(conn, tx_id, attachment_id, user)
+    return await attachments.remove(conn, row["id"], row["file_path"])
@@ -0,0 +1,142 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from app.models import Budget, BudgetStatus
+from app.database import get_db, DictCursor
+from app.serialization import rows_response, row_response
+from typing import List, Optional
+from app.auth import get_current_user
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
+from app import budgets
+
+router = APIRouter()
+
+CURRENT_PERIOD_SQL = budgets.PERIOD_START_SQL.format(day="CURDATE()")
+
+# --- CRUD Logic & Endpoints for Budgets ---
+
+async def _check_budget(cursor, budget, user):
+    if budget.period not in budgets.PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(budgets.PERIODS)}")
+    if budget.account_id is not None:
+        await cursor.execute("SELECT id FROM accounts WHERE id=%s AND user_id=%s", (budget.account_id, user["id"]))
+        if not await cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Account not found or not authorized")
+
+def _status(row):
+    spent = float(row["spent"] or 0)
+    amount = float(row["amount"])
+    return BudgetStatus(
+        budget_id=row["id"],
+        period=row["period"],
+        period_start=row["period_start"],
+        amount=amount,
+        spent=spent,
+        remaining=amount - spent,
+        over_budget=spent > amount,
+    )
+
+@router.post("/", response_model=int)
+async def create_budget(budget: Budget, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        await _check_budget(cursor, budget, user)
+        await cursor.execute(
+            "INSERT INTO budgets (user_id, account_id, category, amount, period, currency) VALUES (%s, %s, %s, %s, %s, %s)",
+            (user["id"], budget.account_id, budget.category, budget.amount, budget.period, budget.currency)
+        )
+        budget_id = cursor.lastrowid
+        # Seed spend for existing transactions from the rollups
+        await budgets.rebuild(cursor, budget_id)
+        await conn.commit()
+        return budget_id
+
+@router.get("/", response_model=List[Budget])
+async def get_budgets(
+    response: Response,
+    user=Depends(get_current_user),
+    conn=Depends(get_db),
+    account_id: Optional[int] = None,
+    category: Optional[str] = None,
+    page_cursor: Optional[str] = CursorParam,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    async with conn.cursor(DictCursor) as cursor:
+        query = "SELECT * FROM budgets WHERE user_id = %s"
+        params = [user["id"]]
+        if account_id:
+            query += " AND account_id = %s"
+            params.append(account_id)
+        if category:
+            query += " AND category = %s"
+            params.append(category)
+        if page_cursor:
+            clause, clause_params = keyset_condition(page_cursor, "id")
+            query += " AND " + clause
+            params.extend(clause_params)
+        query += " ORDER BY id DESC LIMIT %s OFFSET %s"
+        params.extend([limit, 0 if page_cursor else offset])
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        set_next_cursor(response, rows, limit)
+        return rows_response(Budget, rows, response)
+
+@router.get("/status", response_model=List[BudgetStatus])
+async def get_budgets_status(user=Depends(get_current_user), conn=Depends(get_db)):
+    """
+    Current-period spend of every budget of the current user, read from the tracked totals.
+    """
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute(f"""
+            SELECT b.id, b.period, b.amount, {CURRENT_PERIOD_SQL} AS period_start, s.spent
+            FROM budgets b
+            LEFT JOIN budget_spend s ON s.budget_id = b.id AND s.period_start = {CURRENT_PERIOD_SQL}
+            WHERE b.user_id = %s ORDER BY b.id
+        """, (user["id"],))
+        return [_status(row) for row in await cursor.fetchall()]
+
+@router.get("/{budget_id}", response_model=Budget)
+async def get_budget(budget_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("SELECT * FROM budgets WHERE id=%s AND user_id=%s", (budget_id, user["id"]))
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Budget not found")
+        return row_response(Budget, row)
+
+@router.get("/{budget_id}/status", response_model=BudgetStatus)
+async def get_budget_status(budget_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("SELECT id, period, amount FROM budgets WHERE id=%s AND user_id=%s", (budget_id, user["id"]))
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Budget not found")
+        # Matches PERIOD_START_SQL, which treats unknown periods as monthly
+        row["period_start"] = budgets.period_start(row["period"] if row["period"] in budgets.PERIODS else "monthly")
+        await cursor.execute("SELECT spent FROM budget_spend WHERE budget_id=%s AND period_start=%s", (budget_id, row["period_start"]))
+        spend = await cursor.fetchone()
+        row["spent"] = spend["spent"] if spend else 0
+        return _status(row)
+
+@router.put("/{budget_id}", response_model=bool)
+async def update_budget(budget_id: int, budget: Budget, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT id FROM budgets WHERE id=%s AND user_id=%s FOR UPDATE", (budget_id, user["id"]))
+        if not await cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Budget not found or not authorized")
+        await _check_budget(cursor, budget, user)
+        await cursor.execute(
+            "UPDATE budgets SET account_id=%s, category=%s, amount=%s, period=%s, currency=%s WHERE id=%s",
+            (budget.account_id, budget.category, budget.amount, budget.period, budget.currency, budget_id)
+        )
+        updated = cursor.rowcount > 0
+        # The account, category or period may have changed which transactions count
+        await budgets.rebuild(cursor, budget_id)
+        await conn.commit()
+        return updated
+
+@router.delete("/{budget_id}", response_model=bool)
+async def delete_budget(budget_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        await cursor.execute("DELETE FROM budgets WHERE id=%s AND user_id=%s", (budget_id, user["id"]))
+        deleted = cursor.rowcount > 0
+        await conn.commit()
+        return deleted
@@ -1,35 +1,42 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from app.models import CreditCard
-from app.database import create_mysql_connection
+from app.database import get_db, DictCursor
+from app.serialization import rows_response, row_response
 from typing import List, Optional
 from app.auth import get_current_user
+from app.ownership import scoped_insert, scoped_update, scoped_delete
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
 
 router = APIRouter()
 
 # --- CRUD Logic & Endpoints for Credit Cards ---
 
 @router.post("/", response_model=int)
-def create_credit_card(card: CreditCard, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO credit_cards (account_id, card_number, limit_amount, balance, due_date) VALUES (%s, %s, %s, %s, %s)",
-            (card.account_id, card.card_number, card.limit_amount, card.balance, card.due_date)
-        )
-        conn.commit()
-        return cursor.lastrowid
+async def create_credit_card(card: CreditCard, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        card_id = await scoped_insert(cursor, "credit_cards", {
+            "account_id": card.account_id,
+            "card_number": card.card_number,
+            "limit_amount": card.limit_amount,
+            "balance": card.balance,
+            "due_date": card.due_date,
+        }, user["id"])
+        await conn.commit()
+        return card_id
 
 @router.get("/", response_model=List[CreditCard])
-def get_credit_cards(
+async def get_credit_cards(
+    response: Response,
     user=Depends(get_current_user),
+    conn=Depends(get_db),
     account_id: Optional[int] = None,
+    page_cursor: Optional[str] = CursorParam,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
     search: Optional[str] = None
 ):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        query = "SELECT c.* FROM credit_cards c JOIN accounts a ON c.account_id = a.id WHERE a.user_id = %s"
+    async with conn.cursor(DictCursor) as cursor:
+        query = "SELECT c.* FROM credit_cards c WHERE c.user_id = %s"
         params = [user["id"]]
         if account_id:
             query += " AND c.account_id = %s"
@@ -37,47 +44,45 @@ def get_credit_cards(
         if search:
             query += " AND (c.card_number LIKE %s)"
             params.append(f"%{search}%")
+        if page_cursor:
+            clause, clause_params = keyset_condition(page_cursor, "c.id")
+            query += " AND " + clause
+            params.extend(clause_params)
         query += " ORDER BY c.id DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        return [CreditCard(**row) for row in rows]
+        params.extend([limit, 0 if page_cursor else offset])
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        set_next_cursor(response, rows, limit)
+        return rows_response(CreditCard, rows, response)
 
 @router.get("/{card_id}", response_model=CreditCard)
-def get_credit_card(card_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("""
+async def get_credit_card(card_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("""
             SELECT c.* FROM credit_cards c
-            JOIN accounts a ON c.account_id = a.id
-            WHERE c.id=%s AND a.user_id=%s
+            WHERE c.id=%s AND c.user_id=%s
         """, (card_id, user["id"]))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Credit card not found")
-        return CreditCard(**row)
+        return row_response(CreditCard, row)
 
 @router.put("/{card_id}", response_model=bool)
-def update_credit_card(card_id: int, card: CreditCard, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT c.id FROM credit_cards c JOIN accounts a ON c.account_id = a.id WHERE c.id=%s AND a.user_id=%s", (card_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Credit card not found or not authorized")
-        cursor.execute(
-            "UPDATE credit_cards SET account_id=%s, card_number=%s, limit_amount=%s, balance=%s, due_date=%s WHERE id=%s",
-            (card.account_id, card.card_number, card.limit_amount, card.balance, card.due_date, card_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
+async def update_credit_card(card_id: int, card: CreditCard, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        updated = await scoped_update(cursor, "credit_cards", card_id, user["id"], {
+            "account_id": card.account_id,
+            "card_number": card.card_number,
+            "limit_amount": card.limit_amount,
+            "balance": card.balance,
+            "due_date": card.due_date,
+        }, "Credit card")
+        await conn.commit()
+        return updated
 
 @router.delete("/{card_id}", response_model=bool)
-def delete_credit_card(card_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT c.id FROM credit_cards c JOIN accounts a ON c.account_id = a.id WHERE c.id=%s AND a.user_id=%s", (card_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Credit card not found or not authorized")
-        cursor.execute("DELETE FROM credit_cards WHERE id=%s", (card_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def delete_credit_card(card_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        deleted = await scoped_delete(cursor, "credit_cards", card_id, user["id"], "Credit card")
+        await conn.commit()
+        return deleted
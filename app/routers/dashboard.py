@@ -0,0 +1,106 @@
+import os
+import asyncio
+from datetime import date, timedelta
+from typing import Optional
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import Response
+from app.models import Account, CreditCard, MonthlyPayment, Transaction, Notification
+from app.database import pooled_connection, DictCursor, PoolTimeout, Error
+from app.serialization import encoder_for
+from app.auth import get_current_user
+from app import rollups
+
+router = APIRouter()
+
+DASHBOARD_LIST_LIMIT = int(os.getenv("DASHBOARD_LIST_LIMIT", 10))
+DASHBOARD_UPCOMING_DAYS = int(os.getenv("DASHBOARD_UPCOMING_DAYS", 30))
+DASHBOARD_SUMMARY_DAYS = int(os.getenv("DASHBOARD_SUMMARY_DAYS", 30))
+DASHBOARD_DUE_DAYS = int(os.getenv("DASHBOARD_DUE_DAYS", 3))
+
+# --- Composite dashboard load ---
+# Each part runs on its own pooled connection and all parts run concurrently, so the page costs
+# one authentication and the latency of the slowest query. A failing part reports its error in
+# place without failing the others.
+
+async def _fetch(query, params):
+    async with pooled_connection() as conn:
+        async with conn.cursor(DictCursor) as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+async def _accounts(user_id):
+    rows = await _fetch("SELECT * FROM accounts WHERE user_id = %s ORDER BY id", (user_id,))
+    return [encoder_for(Account).project(row) for row in rows]
+
+async def _credit_cards(user_id):
+    rows = await _fetch(
+        "SELECT * FROM credit_cards WHERE user_id = %s ORDER BY id",
+        (user_id,)
+    )
+    return [encoder_for(CreditCard).project(row) for row in rows]
+
+async def _upcoming_payments(user_id):
+    today = date.today()
+    rows = await _fetch('''
+        SELECT * FROM monthly_payments
+        WHERE user_id = %s AND due_date BETWEEN %s AND %s
+        ORDER BY due_date, id LIMIT %s
+    ''', (user_id, today, today + timedelta(days=DASHBOARD_UPCOMING_DAYS), DASHBOARD_LIST_LIMIT))
+    return [encoder_for(MonthlyPayment).project(row) for row in rows]
+
+async def _recent_transactions(user_id):
+    rows = await _fetch('''
+        SELECT * FROM transactions
+        WHERE user_id = %s ORDER BY date DESC, id DESC LIMIT %s
+    ''', (user_id, DASHBOARD_LIST_LIMIT))
+    return [encoder_for(Transaction).project(row) for row in rows]
+
+async def _due_notifications(user_id):
+    today = date.today()
+    rows = await _fetch('''
+        SELECT n.* FROM notifications n
+        JOIN monthly_payments mp ON n.monthly_payment_id = mp.id
+        WHERE n.user_id = %s AND COALESCE(n.cycle, mp.due_date) BETWEEN %s AND %s
+    ''', (user_id, today, today + timedelta(days=DASHBOARD_DUE_DAYS)))
+    return [encoder_for(Notification).project(row) for row in rows]
+
+async def _summary(user_id):
+    start_date = date.today() - timedelta(days=DASHBOARD_SUMMARY_DAYS - 1)
+    query, params = rollups.summary_query(user_id, "day", start_date.isoformat())
+    rows = await _fetch(query, tuple(params))
+    return [{"date": row["date"], "amount": float(row["amount"])} for row in rows]
+
+PARTS = {
+    "accounts": _accounts,
+    "credit_cards": _credit_cards,
+    "upcoming_payments": _upcoming_payments,
+    "recent_transactions": _recent_transactions,
+    "due_notifications": _due_notifications,
+    "summary": _summary,
+}
+
+async def _run_part(name, user_id):
+    try:
+        return {"data": await PARTS[name](user_id)}
+    except PoolTimeout:
+        return {"error": "Database busy, please retry"}
+    except Error as e:
+        print(f"Dashboard part {name} failed: {e}")
+        return {"error": "Database error"}
+
+@router.get("/")
+async def get_dashboard(
+    parts: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(PARTS)}"),
+    user=Depends(get_current_user)
+):
+    """
+    Everything the dashboard screen needs in one call. Each part is returned as {"data": ...}
+    or, if that part failed, {"error": ...}.
+    """
+    names = list(PARTS) if not parts else [name.strip() for name in parts.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PARTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dashboard parts: {', '.join(unknown)}")
+    results = await asyncio.gather(*(_run_part(name, user["id"]) for name in names))
+    return Response(orjson.dumps(dict(zip(names, results))), media_type="application/json")
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+from typing import Optional
+import orjson
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+from app.database import get_db, DictCursor
+from app.auth import get_current_user
+from app.ownership import owner_scope
+from app import forecast as engine
+
+router = APIRouter()
+
+# --- Cash-flow forecast endpoint ---
+# Responses are cached per user by app.http_cache like the other read endpoints, and are
+# invalidated by any write to the accounts, income, payment, installment or card routers.
+
+async def _fetch(cursor, query, params):
+    await cursor.execute(query, params)
+    return await cursor.fetchall()
+
+@router.get("/")
+async def get_forecast(
+    user=Depends(get_current_user),
+    conn=Depends(get_db),
+    months: int = Query(3, ge=1, le=24),
+    account_id: Optional[int] = None
+):
+    """
+    Projected end-of-day balance of each account for every day from today through the same day
+    `months` months ahead. balances[i] is the balance on start_date + i days.
+    """
+    scope, params = owner_scope(user["id"], account_id)
+    account_scope, account_params = owner_scope(user["id"], account_id, "id")
+    since = date.today() - timedelta(days=31 * engine.FORECAST_LOOKBACK_MONTHS)
+    async with conn.cursor(DictCursor) as cursor:
+        accounts = await _fetch(cursor, f"SELECT id, balance FROM accounts WHERE {account_scope} ORDER BY id", account_params)
+        income = await _fetch(
+            cursor,
+            f"SELECT account_id, source, amount, date FROM income WHERE {scope} AND date >= %s",
+            params + (since,)
+        )
+        payments = await _fetch(
+            cursor,
+            f"SELECT account_id, amount, due_date FROM monthly_payments WHERE {scope}",
+            params
+        )
+        installments = await _fetch(
+            cursor,
+            f"SELECT * FROM installments WHERE {scope}",
+            params
+        )
+        cards = await _fetch(
+            cursor,
+            f"SELECT account_id, balance, due_date FROM credit_cards WHERE {scope}",
+            params
+        )
+    start, account_ids, balances = engine.forecast(accounts, income, payments, installments, cards, months)
+    lowest = balances.argmin(axis=1) if len(account_ids) else []
+    result = {
+        "start_date": start,
+        "days": balances.shape[1],
+        "accounts": [
+            {
+                "account_id": account_id,
+                "balances": balances[i] / 100,
+                "end_balance": int(balances[i, -1]) / 100,
+                "min_balance": int(balances[i, lowest[i]]) / 100,
+                "min_date": start + timedelta(days=int(lowest[i])),
+            }
+            for i, account_id in enumerate(account_ids)
+        ],
+    }
+    return Response(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
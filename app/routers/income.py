@@ -1,95 +1,134 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from app.models import Income
-from app.database import create_mysql_connection
+from app.database import get_db, DictCursor
+from app.serialization import rows_response, row_response
 from typing import List, Optional
 from app.auth import get_current_user
+from app.ownership import scoped_insert, scoped_update, raise_not_owned
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
+from app.search import SortParam, search_condition, relevance_order
+from app import balances, archive
 
 router = APIRouter()
 
+SEARCH_COLUMNS = ["i.source"]
+
 # --- CRUD Logic & Endpoints for Income ---
 
 @router.post("/", response_model=int)
-def create_income(income: Income, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO income (account_id, amount, date, source) VALUES (%s, %s, %s, %s)",
-            (income.account_id, income.amount, income.date, income.source)
-        )
-        conn.commit()
-        return cursor.lastrowid
+async def create_income(income: Income, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        income_id = await scoped_insert(cursor, "income", {
+            "account_id": income.account_id,
+            "amount": income.amount,
+            "date": income.date,
+            "source": income.source,
+        }, user["id"])
+        await balances.apply_deltas(cursor, [balances.income_delta(income.account_id, income.amount)])
+        await conn.commit()
+        return income_id
+
+def _filtered_query(user, account_id, start_date, end_date, source, search, archived=False):
+    table = archive.ARCHIVED["income"] if archived else "income"
+    query = f"SELECT {archive.select_columns('income', 'i')} FROM {table} i WHERE i.user_id = %s"
+    params = [user["id"]]
+    if account_id:
+        query += " AND i.account_id = %s"
+        params.append(account_id)
+    if start_date:
+        query += " AND i.date >= %s"
+        params.append(start_date)
+    if end_date:
+        query += " AND i.date <= %s"
+        params.append(end_date)
+    if source:
+        query += " AND i.source = %s"
+        params.append(source)
+    if search:
+        clause, clause_params = search_condition(search, SEARCH_COLUMNS, fulltext=not archived)
+        query += " AND " + clause
+        params.extend(clause_params)
+    return query, params
 
 @router.get("/", response_model=List[Income])
-def get_incomes(
+async def get_incomes(
+    response: Response,
     user=Depends(get_current_user),
+    conn=Depends(get_db),
     account_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     source: Optional[str] = None,
     search: Optional[str] = None,
+    sort: str = SortParam,
+    page_cursor: Optional[str] = CursorParam,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        query = "SELECT i.* FROM income i JOIN accounts a ON i.account_id = a.id WHERE a.user_id = %s"
-        params = [user["id"]]
-        if account_id:
-            query += " AND i.account_id = %s"
-            params.append(account_id)
-        if start_date:
-            query += " AND i.date >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND i.date <= %s"
-            params.append(end_date)
-        if source:
-            query += " AND i.source = %s"
-            params.append(source)
-        if search:
-            query += " AND (i.source LIKE %s)"
-            params.append(f"%{search}%")
-        query += " ORDER BY i.date DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        return [Income(**row) for row in rows]
+    async with conn.cursor(DictCursor) as cursor:
+        query, params = _filtered_query(user, account_id, start_date, end_date, source, search)
+        rank, rank_params = relevance_order(search, SEARCH_COLUMNS) if search and sort == "relevance" else (None, [])
+        if rank:
+            # Ranking needs the FULLTEXT index, which only the live table has
+            query += f" ORDER BY {rank}, i.id DESC LIMIT %s OFFSET %s"
+            params.extend([*rank_params, limit, offset])
+        else:
+            archive_query, archive_params = _filtered_query(user, account_id, start_date, end_date, source, search, archived=True)
+            if page_cursor:
+                clause, clause_params = keyset_condition(page_cursor, "i.id", "i.date")
+                query += " AND " + clause
+                params.extend(clause_params)
+                archive_query += " AND " + clause
+                archive_params.extend(clause_params)
+            query, params = archive.tiered_page(query, params, archive_query, archive_params, "date DESC, id DESC", limit, 0 if page_cursor else offset)
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        if not rank:
+            set_next_cursor(response, rows, limit, "date")
+        return rows_response(Income, rows, response)
 
 @router.get("/{income_id}", response_model=Income)
-def get_income(income_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("""
-            SELECT i.* FROM income i
-            JOIN accounts a ON i.account_id = a.id
-            WHERE i.id=%s AND a.user_id=%s
-        """, (income_id, user["id"]))
-        row = cursor.fetchone()
+async def get_income(income_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        row = await archive.fetch_owned(cursor, "income", income_id, user["id"])
         if not row:
             raise HTTPException(status_code=404, detail="Income not found")
-        return Income(**row)
+        return row_response(Income, row)
 
 @router.put("/{income_id}", response_model=bool)
-def update_income(income_id: int, income: Income, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT i.id FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id=%s AND a.user_id=%s", (income_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Income not found or not authorized")
-        cursor.execute(
-            "UPDATE income SET account_id=%s, amount=%s, date=%s, source=%s WHERE id=%s",
-            (income.account_id, income.amount, income.date, income.source, income_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
+async def update_income(income_id: int, income: Income, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        # Lock the row so the balance delta is computed from the value being replaced
+        await cursor.execute("SELECT account_id, amount FROM income WHERE id=%s AND user_id=%s FOR UPDATE", (income_id, user["id"]))
+        old = await cursor.fetchone()
+        if not old:
+            await archive.reject_archived(cursor, "income", income_id, user["id"], "Income")
+            await raise_not_owned(cursor, "income", income_id, user["id"], "Income")
+        # Also requires the target account to be the user's
+        updated = await scoped_update(cursor, "income", income_id, user["id"], {
+            "account_id": income.account_id,
+            "amount": income.amount,
+            "date": income.date,
+            "source": income.source,
+        }, "Income")
+        await balances.apply_deltas(cursor, [
+            balances.income_delta(*old, sign=-1),
+            balances.income_delta(income.account_id, income.amount),
+        ])
+        await conn.commit()
+        return updated
 
 @router.delete("/{income_id}", response_model=bool)
-def delete_income(income_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT i.id FROM income i JOIN accounts a ON i.account_id = a.id WHERE i.id=%s AND a.user_id=%s", (income_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Income not found or not authorized")
-        cursor.execute("DELETE FROM income WHERE id=%s", (income_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def delete_income(income_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT account_id, amount FROM income WHERE id=%s AND user_id=%s FOR UPDATE", (income_id, user["id"]))
+        old = await cursor.fetchone()
+        if not old:
+            await archive.reject_archived(cursor, "income", income_id, user["id"], "Income")
+            await raise_not_owned(cursor, "income", income_id, user["id"], "Income")
+        await cursor.execute("DELETE FROM income WHERE id=%s", (income_id,))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            await balances.apply_deltas(cursor, [balances.income_delta(*old, sign=-1)])
+        await conn.commit()
+        return deleted
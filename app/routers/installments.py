@@ -1,37 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from app.models import Installment
-from app.database import create_mysql_connection
-from typing import List, Optional
+from app.database import get_db, DictCursor
+from app.serialization import rows_response, row_response
+from typing import List, Optional, Dict, Any
+from datetime import date
 from app.auth import get_current_user
+from app.ownership import scoped_insert, scoped_update, scoped_delete
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
+from app.search import SortParam, search_condition, relevance_order
+from app import schedules
 
 router = APIRouter()
 
+SEARCH_COLUMNS = ["i.description"]
+
 # --- CRUD Logic & Endpoints for Installments ---
 
 @router.post("/", response_model=int)
-def create_installment(inst: Installment, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO installments (account_id, total_amount, installment_amount, start_date, end_date, description) VALUES (%s, %s, %s, %s, %s, %s)",
-            (inst.account_id, inst.total_amount, inst.installment_amount, inst.start_date, inst.end_date, inst.description)
-        )
-        conn.commit()
-        return cursor.lastrowid
+async def create_installment(inst: Installment, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        inst_id = await scoped_insert(cursor, "installments", {
+            "account_id": inst.account_id,
+            "total_amount": inst.total_amount,
+            "installment_amount": inst.installment_amount,
+            "start_date": inst.start_date,
+            "end_date": inst.end_date,
+            "description": inst.description,
+        }, user["id"])
+        await conn.commit()
+        return inst_id
 
 @router.get("/", response_model=List[Installment])
-def get_installments(
+async def get_installments(
+    response: Response,
     user=Depends(get_current_user),
+    conn=Depends(get_db),
     account_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     search: Optional[str] = None,
+    sort: str = SortParam,
+    page_cursor: Optional[str] = CursorParam,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        query = "SELECT i.* FROM installments i JOIN accounts a ON i.account_id = a.id WHERE a.user_id = %s"
+    async with conn.cursor(DictCursor) as cursor:
+        query = "SELECT i.* FROM installments i WHERE i.user_id = %s"
         params = [user["id"]]
         if account_id:
             query += " AND i.account_id = %s"
@@ -43,49 +57,93 @@ def get_installments(
             query += " AND i.end_date <= %s"
             params.append(end_date)
         if search:
-            query += " AND (i.description LIKE %s)"
-            params.append(f"%{search}%")
-        query += " ORDER BY i.start_date DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        return [Installment(**row) for row in rows]
+            clause, clause_params = search_condition(search, SEARCH_COLUMNS)
+            query += " AND " + clause
+            params.extend(clause_params)
+        rank, rank_params = relevance_order(search, SEARCH_COLUMNS) if search and sort == "relevance" else (None, [])
+        if rank:
+            query += f" ORDER BY {rank}, i.id DESC LIMIT %s OFFSET %s"
+            params.extend([*rank_params, limit, offset])
+        else:
+            if page_cursor:
+                clause, clause_params = keyset_condition(page_cursor, "i.id", "i.start_date", nullable=True)
+                query += " AND " + clause
+                params.extend(clause_params)
+            query += " ORDER BY i.start_date DESC, i.id DESC LIMIT %s OFFSET %s"
+            params.extend([limit, 0 if page_cursor else offset])
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        if not rank:
+            set_next_cursor(response, rows, limit, "start_date")
+        return rows_response(Installment, rows, response)
+
+@router.get("/projection", response_model=List[Dict[str, Any]])
+async def get_installments_projection(
+    user=Depends(get_current_user),
+    conn=Depends(get_db),
+    start_date: Optional[date] = None,
+    months: int = Query(12, ge=1, le=120),
+    account_id: Optional[int] = None
+):
+    """
+    Total installment payments due per month across all of the current user's installments,
+    for `months` months starting with start_date's month (default: this month).
+    """
+    async with conn.cursor(DictCursor) as cursor:
+        query = "SELECT i.* FROM installments i WHERE i.user_id = %s"
+        params = [user["id"]]
+        if account_id:
+            query += " AND i.account_id = %s"
+            params.append(account_id)
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+    return schedules.monthly_projection(rows, start_date or date.today(), months)
+
+@router.get("/{inst_id}/schedule", response_model=Dict[str, Any])
+async def get_installment_schedule(inst_id: int, as_of: Optional[date] = None, user=Depends(get_current_user), conn=Depends(get_db)):
+    """
+    Every payment of the installment with its date, amount and the balance left afterwards.
+    Payments on or before as_of (default: today) are marked paid.
+    """
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("""
+            SELECT i.* FROM installments i
+            WHERE i.id=%s AND i.user_id=%s
+        """, (inst_id, user["id"]))
+        row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Installment not found")
+    return schedules.schedule(row, as_of)
 
 @router.get("/{inst_id}", response_model=Installment)
-def get_installment(inst_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("""
+async def get_installment(inst_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("""
             SELECT i.* FROM installments i
-            JOIN accounts a ON i.account_id = a.id
-            WHERE i.id=%s AND a.user_id=%s
+            WHERE i.id=%s AND i.user_id=%s
         """, (inst_id, user["id"]))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Installment not found")
-        return Installment(**row)
+        return row_response(Installment, row)
 
 @router.put("/{inst_id}", response_model=bool)
-def update_installment(inst_id: int, inst: Installment, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT i.id FROM installments i JOIN accounts a ON i.account_id = a.id WHERE i.id=%s AND a.user_id=%s", (inst_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Installment not found or not authorized")
-        cursor.execute(
-            "UPDATE installments SET account_id=%s, total_amount=%s, installment_amount=%s, start_date=%s, end_date=%s, description=%s WHERE id=%s",
-            (inst.account_id, inst.total_amount, inst.installment_amount, inst.start_date, inst.end_date, inst.description, inst_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
+async def update_installment(inst_id: int, inst: Installment, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        updated = await scoped_update(cursor, "installments", inst_id, user["id"], {
+            "account_id": inst.account_id,
+            "total_amount": inst.total_amount,
+            "installment_amount": inst.installment_amount,
+            "start_date": inst.start_date,
+            "end_date": inst.end_date,
+            "description": inst.description,
+        }, "Installment")
+        await conn.commit()
+        return updated
 
 @router.delete("/{inst_id}", response_model=bool)
-def delete_installment(inst_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT i.id FROM installments i JOIN accounts a ON i.account_id = a.id WHERE i.id=%s AND a.user_id=%s", (inst_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Installment not found or not authorized")
-        cursor.execute("DELETE FROM installments WHERE id=%s", (inst_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def delete_installment(inst_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        deleted = await scoped_delete(cursor, "installments", inst_id, user["id"], "Installment")
+        await conn.commit()
+        return deleted
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from app.models import User, UserCreate, UserLogin, Token
-from app.database import create_mysql_connection
-from passlib.context import CryptContext
+from app.models import User, UserCreate, UserLogin, Token, PasswordChange
+from app.database import pooled_connection, DictCursor
+from app.cache import TTLCache
+from app.passwords import hash_password, verify_password
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 import os
@@ -12,17 +13,15 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)),
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24 * 7))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login/token")
 
-router = APIRouter()
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Bearer token -> user row, so repeat requests with the same token skip the users lookup
+user_cache = TTLCache(max_size=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+router = APIRouter()
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -30,37 +29,62 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_user_by_username(username: str):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("SELECT * FROM users WHERE username=%s", (username,))
-        row = cursor.fetchone()
-        return row
+async def get_user_by_username(username: str):
+    async with pooled_connection() as conn:
+        async with conn.cursor(DictCursor) as cursor:
+            await cursor.execute("SELECT * FROM users WHERE username=%s", (username,))
+            row = await cursor.fetchone()
+            return row
+
+def invalidate_user(username: str):
+    """
+    Drop every cached token for a user; call after a password change or user deletion.
+    """
+    return user_cache.discard_where(lambda token, user: user["username"] == username)
+
+async def create_user(user: UserCreate, hashed_pw: str) -> int:
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                (user.username, user.email, hashed_pw)
+            )
+            await conn.commit()
+            return cursor.lastrowid
 
-def authenticate_user(username: str, password: str):
-    user = get_user_by_username(username)
-    if not user or not verify_password(password, user["password_hash"]):
+async def set_password_hash(user_id: int, hashed_pw: str):
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("UPDATE users SET password_hash=%s WHERE id=%s", (hashed_pw, user_id))
+            await conn.commit()
+
+async def authenticate_user(username: str, password: str):
+    user = await get_user_by_username(username)
+    if not user or not await verify_password(password, user["password_hash"]):
         return None
     return user
 
 @router.post("/register", response_model=User)
-def register(user: UserCreate):
-    if get_user_by_username(user.username):
+async def register(user: UserCreate):
+    if await get_user_by_username(user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        hashed_pw = get_password_hash(user.password)
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-            (user.username, user.email, hashed_pw)
-        )
-        conn.commit()
-        user_id = cursor.lastrowid
+    hashed_pw = await hash_password(user.password)
+    user_id = await create_user(user, hashed_pw)
     return User(id=user_id, username=user.username, email=user.email)
 
+@router.post("/change-password", response_model=bool)
+async def change_password(data: PasswordChange):
+    user = await authenticate_user(data.username, data.old_password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    hashed_pw = await hash_password(data.new_password)
+    await set_password_hash(user["id"], hashed_pw)
+    invalidate_user(user["username"])
+    return True
+
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     access_token = create_access_token(data={"sub": user["username"]})
@@ -72,7 +96,7 @@ from app.models import TokenData
 from jose import JWTError, jwt
 from fastapi import Request
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -86,7 +110,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user_by_username(token_data.username)
+    user = await get_user_by_username(token_data.username)
     if user is None:
         raise credentials_exception
     return user
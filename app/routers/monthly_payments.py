@@ -1,37 +1,47 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from app.models import MonthlyPayment
-from app.database import create_mysql_connection
+from app.database import get_db, DictCursor
+from app.serialization import rows_response, row_response
 from typing import List, Optional
 from app.auth import get_current_user
+from app.ownership import scoped_insert, scoped_update, scoped_delete
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
+from app.search import SortParam, search_condition, relevance_order
 
 router = APIRouter()
 
+SEARCH_COLUMNS = ["mp.description"]
+
 # --- CRUD Logic & Endpoints for Monthly Payments ---
 
 @router.post("/", response_model=int)
-def create_monthly_payment(mp: MonthlyPayment, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO monthly_payments (account_id, amount, due_date, description) VALUES (%s, %s, %s, %s)",
-            (mp.account_id, mp.amount, mp.due_date, mp.description)
-        )
-        conn.commit()
-        return cursor.lastrowid
+async def create_monthly_payment(mp: MonthlyPayment, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        mp_id = await scoped_insert(cursor, "monthly_payments", {
+            "account_id": mp.account_id,
+            "amount": mp.amount,
+            "due_date": mp.due_date,
+            "description": mp.description,
+        }, user["id"])
+        await conn.commit()
+        return mp_id
 
 @router.get("/", response_model=List[MonthlyPayment])
-def get_monthly_payments(
+async def get_monthly_payments(
+    response: Response,
     user=Depends(get_current_user),
+    conn=Depends(get_db),
     account_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     search: Optional[str] = None,
+    sort: str = SortParam,
+    page_cursor: Optional[str] = CursorParam,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        query = "SELECT mp.* FROM monthly_payments mp JOIN accounts a ON mp.account_id = a.id WHERE a.user_id = %s"
+    async with conn.cursor(DictCursor) as cursor:
+        query = "SELECT mp.* FROM monthly_payments mp WHERE mp.user_id = %s"
         params = [user["id"]]
         if account_id:
             query += " AND mp.account_id = %s"
@@ -43,49 +53,55 @@ def get_monthly_payments(
             query += " AND mp.due_date <= %s"
             params.append(end_date)
         if search:
-            query += " AND (mp.description LIKE %s)"
-            params.append(f"%{search}%")
-        query += " ORDER BY mp.due_date DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        return [MonthlyPayment(**row) for row in rows]
+            clause, clause_params = search_condition(search, SEARCH_COLUMNS)
+            query += " AND " + clause
+            params.extend(clause_params)
+        rank, rank_params = relevance_order(search, SEARCH_COLUMNS) if search and sort == "relevance" else (None, [])
+        if rank:
+            query += f" ORDER BY {rank}, mp.id DESC LIMIT %s OFFSET %s"
+            params.extend([*rank_params, limit, offset])
+        else:
+            if page_cursor:
+                clause, clause_params = keyset_condition(page_cursor, "mp.id", "mp.due_date", nullable=True)
+                query += " AND " + clause
+                params.extend(clause_params)
+            query += " ORDER BY mp.due_date DESC, mp.id DESC LIMIT %s OFFSET %s"
+            params.extend([limit, 0 if page_cursor else offset])
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        if not rank:
+            set_next_cursor(response, rows, limit, "due_date")
+        return rows_response(MonthlyPayment, rows, response)
 
 @router.get("/{mp_id}", response_model=MonthlyPayment)
-def get_monthly_payment(mp_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("""
+async def get_monthly_payment(mp_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("""
             SELECT mp.* FROM monthly_payments mp
-            JOIN accounts a ON mp.account_id = a.id
-            WHERE mp.id=%s AND a.user_id=%s
+            WHERE mp.id=%s AND mp.user_id=%s
         """, (mp_id, user["id"]))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Monthly payment not found")
-        return MonthlyPayment(**row)
+        return row_response(MonthlyPayment, row)
 
 @router.put("/{mp_id}", response_model=bool)
-def update_monthly_payment(mp_id: int, mp: MonthlyPayment, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT mp.id FROM monthly_payments mp JOIN accounts a ON mp.account_id = a.id WHERE mp.id=%s AND a.user_id=%s", (mp_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Monthly payment not found or not authorized")
-        cursor.execute(
-            "UPDATE monthly_payments SET account_id=%s, amount=%s, due_date=%s, description=%s WHERE id=%s",
-            (mp.account_id, mp.amount, mp.due_date, mp.description, mp_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
+async def update_monthly_payment(mp_id: int, mp: MonthlyPayment, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        updated = await scoped_update(cursor, "monthly_payments", mp_id, user["id"], {
+            "account_id": mp.account_id,
+            "amount": mp.amount,
+            "due_date": mp.due_date,
+            "description": mp.description,
+        }, "Monthly payment")
+        await conn.commit()
+        return updated
 
 @router.delete("/{mp_id}", response_model=bool)
-def delete_monthly_payment(mp_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT mp.id FROM monthly_payments mp JOIN accounts a ON mp.account_id = a.id WHERE mp.id=%s AND a.user_id=%s", (mp_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Monthly payment not found or not authorized")
-        cursor.execute("DELETE FROM monthly_payments WHERE id=%s", (mp_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def delete_monthly_payment(mp_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        # Notifications reference the payment; scoped by user_id, and rolled back with it on 403/404
+        await cursor.execute("DELETE FROM notifications WHERE monthly_payment_id=%s AND user_id=%s", (mp_id, user["id"]))
+        deleted = await scoped_delete(cursor, "monthly_payments", mp_id, user["id"], "Monthly payment")
+        await conn.commit()
+        return deleted
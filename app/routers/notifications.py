@@ -1,61 +1,146 @@
-from fastapi import APIRouter, HTTPException, Depends
+import os
+import json
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from app.models import Notification
-from app.database import create_mysql_connection
-from typing import List
+from app.database import get_db, pooled_connection, DictCursor
+from app.serialization import rows_response
+from typing import List, Optional
 from datetime import datetime, timedelta
 from app.auth import get_current_user
+from app.ownership import scoped_update, scoped_delete
+from app import pubsub
 
 router = APIRouter()
 
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", 15))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", 3000))
+SSE_CATCH_UP_BATCH = 100
+
 # --- CRUD Logic & Endpoints for Notifications ---
 
 @router.post("/", response_model=int)
-def create_notification(notification: Notification, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO notifications (monthly_payment_id, message, notified_at, is_read) VALUES (%s, %s, %s, %s)",
-            (notification.monthly_payment_id, notification.message, notification.notified_at or datetime.now(), notification.is_read)
+async def create_notification(notification: Notification, user=Depends(get_current_user), conn=Depends(get_db)):
+    notified_at = notification.notified_at or datetime.now()
+    async with conn.cursor() as cursor:
+        # Only for the user's own payments; user_id is copied from the payment
+        await cursor.execute(
+            "INSERT INTO notifications (monthly_payment_id, message, notified_at, is_read, user_id) SELECT %s, %s, %s, %s, user_id FROM monthly_payments WHERE id=%s AND user_id=%s",
+            (notification.monthly_payment_id, notification.message, notified_at, notification.is_read, notification.monthly_payment_id, user["id"])
         )
-        conn.commit()
-        return cursor.lastrowid
+        if not cursor.rowcount:
+            raise HTTPException(status_code=404, detail="Monthly payment not found or not authorized")
+        notification_id = cursor.lastrowid
+        await conn.commit()
+    await pubsub.publish_notification(user["id"], {
+        **notification.model_dump(),
+        "id": notification_id,
+        "notified_at": notified_at,
+    })
+    return notification_id
 
 @router.get("/", response_model=List[Notification])
-def get_notifications(user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("SELECT * FROM notifications")
-        rows = cursor.fetchall()
-        return [Notification(**row) for row in rows]
+async def get_notifications(user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        await cursor.execute("SELECT * FROM notifications WHERE user_id = %s ORDER BY id", (user["id"],))
+        rows = await cursor.fetchall()
+        return rows_response(Notification, rows)
 
 @router.get("/due/", response_model=List[Notification])
-def get_due_notifications(days: int = 3, user=Depends(get_current_user)):
+async def get_due_notifications(days: int = 3, user=Depends(get_current_user), conn=Depends(get_db)):
     """
-    Get notifications for monthly payments due today or within the next X days (default: 3).
+    Get notifications for the current user's monthly payments due today or within the next X days (default: 3).
+    Notifications are generated in the background by app.notifier.
     """
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
+    async with conn.cursor(DictCursor) as cursor:
         query = '''
             SELECT n.* FROM notifications n
             JOIN monthly_payments mp ON n.monthly_payment_id = mp.id
-            WHERE mp.due_date BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL %s DAY)
+            WHERE n.user_id = %s AND COALESCE(n.cycle, mp.due_date) BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL %s DAY)
         '''
-        cursor.execute(query, (days,))
-        rows = cursor.fetchall()
-        return [Notification(**row) for row in rows]
+        await cursor.execute(query, (user["id"], days))
+        rows = await cursor.fetchall()
+        return rows_response(Notification, rows)
+
+async def _notifications_after(user_id, last_id, limit=SSE_CATCH_UP_BATCH):
+    # Short-lived connection: a stream must not pin a pooled connection while idle
+    async with pooled_connection() as conn:
+        async with conn.cursor(DictCursor) as cursor:
+            await cursor.execute(
+                "SELECT * FROM notifications WHERE user_id = %s AND id > %s ORDER BY id LIMIT %s",
+                (user_id, last_id, limit)
+            )
+            return await cursor.fetchall()
+
+async def _latest_notification_id(user_id):
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT COALESCE(MAX(id), 0) FROM notifications WHERE user_id = %s", (user_id,))
+            return (await cursor.fetchone())[0]
+
+def _format_event(notification):
+    return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification, default=str)}\n\n"
+
+async def _event_stream(user_id, last_id):
+    subscription = pubsub.broker.subscribe(pubsub.notifications_channel(user_id))
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        resume = last_id is not None
+        if not resume:
+            last_id = await _latest_notification_id(user_id)
+        while True:
+            if resume:
+                # Replay from the database after a reconnect or when this subscriber fell behind
+                resume = False
+                subscription.lagged = False
+                while True:
+                    rows = await _notifications_after(user_id, last_id)
+                    for row in rows:
+                        yield _format_event(row)
+                        last_id = row["id"]
+                    if len(rows) < SSE_CATCH_UP_BATCH:
+                        break
+            message = await subscription.get(timeout=SSE_HEARTBEAT)
+            if subscription.lagged:
+                resume = True
+                continue
+            if message is None:
+                yield ": heartbeat\n\n"
+            elif message["id"] > last_id:
+                yield _format_event(message)
+                last_id = message["id"]
+    finally:
+        subscription.close()
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Resume after this notification id; the Last-Event-ID header is used when omitted"),
+    user=Depends(get_current_user)
+):
+    """
+    Server-sent events channel pushing the current user's new notifications as they are created.
+    Sends a heartbeat comment every SSE_HEARTBEAT seconds and, on reconnect, replays anything after Last-Event-ID.
+    """
+    if last_event_id is None:
+        header = request.headers.get("last-event-id", "")
+        last_event_id = int(header) if header.isdigit() else None
+    return StreamingResponse(
+        _event_stream(user["id"], last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.put("/{notification_id}", response_model=bool)
-def mark_notification_as_read(notification_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("UPDATE notifications SET is_read=TRUE WHERE id=%s", (notification_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def mark_notification_as_read(notification_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        updated = await scoped_update(cursor, "notifications", notification_id, user["id"], {"is_read": True}, "Notification")
+        await conn.commit()
+        return updated
 
 @router.delete("/{notification_id}", response_model=bool)
-def delete_notification(notification_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute("DELETE FROM notifications WHERE id=%s", (notification_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def delete_notification(notification_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        deleted = await scoped_delete(cursor, "notifications", notification_id, user["id"], "Notification")
+        await conn.commit()
+        return deleted
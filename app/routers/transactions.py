@@ -1,125 +1,371 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from app.models import Transaction
-from app.database import create_mysql_connection
+import os
+import io
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.models import Transaction, TransactionImportRow, BulkImportResult
+from app.database import get_db, pool, DictCursor, SSDictCursor, Error
+from app.serialization import rows_response, row_response
+from app.importers import iter_csv, iter_ndjson, iter_ofx
 from typing import List, Optional, Dict, Any
 from app.auth import get_current_user
+from app.ownership import scoped_insert, scoped_update, raise_not_owned
+from app.pagination import CursorParam, keyset_condition, set_next_cursor
+from app.search import SortParam, search_condition, relevance_order
+from app import rollups, balances, budgets, archive, attachments
+from app.http_cache import bump_data_version
 
 router = APIRouter()
 
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 1000))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", 1000))
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", 500))
+EXPORT_COLUMNS = ("id", "account_id", "amount", "date", "description", "category", "currency")
+
+SEARCH_COLUMNS = ["t.description", "t.category"]
+
+INSERT_TRANSACTION_SQL = "INSERT INTO transactions (account_id, amount, date, description, category, currency, user_id) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+
 # --- CRUD Logic & Endpoints for Transactions ---
 
+async def _apply_ledger_effects(cursor, added=(), removed=()):
+    """
+    Keep derived state (spending rollups, account balances, budget spend) in step with transaction
+    writes, inside the caller's DB transaction. Rows are (account_id, category, date, amount).
+    Returns over-budget notifications to publish with budgets.publish() after the commit.
+    """
+    await rollups.apply_deltas(cursor, [rollups.transaction_delta(*row) for row in added] + [rollups.transaction_delta(*row, sign=-1) for row in removed])
+    await balances.apply_deltas(cursor, [balances.transaction_delta(row[0], row[3]) for row in added] + [balances.transaction_delta(row[0], row[3], sign=-1) for row in removed])
+    return await budgets.apply_deltas(cursor, [budgets.spend_delta(*row) for row in added] + [budgets.spend_delta(*row, sign=-1) for row in removed])
+
 @router.post("/", response_model=int)
-def create_transaction(tx: Transaction, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            "INSERT INTO transactions (account_id, amount, date, description, category, currency) VALUES (%s, %s, %s, %s, %s, %s)",
-            (tx.account_id, tx.amount, tx.date, tx.description, tx.category, tx.currency)
-        )
-        conn.commit()
-        return cursor.lastrowid
+async def create_transaction(tx: Transaction, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        tx_id = await scoped_insert(cursor, "transactions", {
+            "account_id": tx.account_id,
+            "amount": tx.amount,
+            "date": tx.date,
+            "description": tx.description,
+            "category": tx.category,
+            "currency": tx.currency,
+        }, user["id"])
+        alerts = await _apply_ledger_effects(cursor, added=[(tx.account_id, tx.category, tx.date, tx.amount)])
+        await conn.commit()
+    await budgets.publish(alerts)
+    return tx_id
+
+async def _iter_json_array(items):
+    for row_number, item in enumerate(items, start=1):
+        yield row_number, item
+
+def _describe_error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+def _ledger_rows(values_list):
+    return [(account_id, category, day, amount) for account_id, amount, day, _, category, _, _ in values_list]
+
+async def _insert_batch(conn, cursor, batch, result):
+    """
+    Insert a batch as one multi-row INSERT. If the server rejects it, retry row by row
+    so the failure is attributed to the offending rows only.
+    """
+    try:
+        await cursor.executemany(INSERT_TRANSACTION_SQL, [values for _, values in batch])
+        alerts = await _apply_ledger_effects(cursor, added=_ledger_rows(values for _, values in batch))
+        await conn.commit()
+        result["inserted"] += len(batch)
+        await budgets.publish(alerts)
+        return
+    except Error:
+        await conn.rollback()
+    inserted = []
+    for row_number, values in batch:
+        try:
+            await cursor.execute(INSERT_TRANSACTION_SQL, values)
+            inserted.append(values)
+        except Error as e:
+            _record_error(result, row_number, str(e))
+    alerts = await _apply_ledger_effects(cursor, added=_ledger_rows(inserted))
+    await conn.commit()
+    result["inserted"] += len(inserted)
+    await budgets.publish(alerts)
+
+def _record_error(result, row_number, message):
+    result["failed"] += 1
+    if len(result["errors"]) < BULK_MAX_ERRORS:
+        result["errors"].append({"row": row_number, "error": message})
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_transactions(
+    request: Request,
+    account_id: Optional[int] = None,
+    user=Depends(get_current_user),
+    conn=Depends(get_db)
+):
+    """
+    Import transactions from a JSON array, NDJSON, CSV (with a header row) or OFX body, chosen by Content-Type.
+    account_id is required for OFX and fills in any row that omits it otherwise.
+    Valid rows are inserted in batches of BULK_CHUNK_SIZE; invalid rows are reported by row number.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/json":
+        payload = await request.json()
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of transactions")
+        rows = _iter_json_array(payload)
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = iter_ndjson(request.stream())
+    elif content_type in ("text/csv", "application/csv"):
+        rows = iter_csv(request.stream())
+    elif content_type in ("application/x-ofx", "application/ofx"):
+        if account_id is None:
+            raise HTTPException(status_code=400, detail="account_id is required for OFX imports")
+        rows = iter_ofx(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Unsupported content type for bulk import")
+
+    result = {"inserted": 0, "failed": 0, "errors": []}
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT id FROM accounts WHERE user_id=%s", (user["id"],))
+        owned = {row[0] for row in await cursor.fetchall()}
+        if account_id is not None and account_id not in owned:
+            raise HTTPException(status_code=404, detail="Account not found or not authorized")
+        batch = []
+        try:
+            async for row_number, data in rows:
+                try:
+                    if not isinstance(data, dict):
+                        raise ValueError("Expected an object")
+                    if "_error" in data:
+                        raise ValueError(data["_error"])
+                    if data.get("account_id") is None and account_id is not None:
+                        data = {**data, "account_id": account_id}
+                    tx = TransactionImportRow.model_validate(data)
+                    if tx.account_id not in owned:
+                        raise ValueError("Account not found or not authorized")
+                except ValueError as e:
+                    _record_error(result, row_number, _describe_error(e))
+                    continue
+                batch.append((row_number, (tx.account_id, tx.amount, tx.date, tx.description, tx.category, tx.currency or 'USD', user["id"])))
+                if len(batch) >= BULK_CHUNK_SIZE:
+                    await _insert_batch(conn, cursor, batch, result)
+                    batch = []
+        except UnicodeDecodeError as e:
+            # Batches before the bad bytes are already committed, and a 400 is not bumped for us
+            if result["inserted"]:
+                await bump_data_version(user["id"])
+            raise HTTPException(
+                status_code=400,
+                detail=f"Request body is not valid UTF-8 ({e.reason}); {result['inserted']} row(s) before it were imported"
+            )
+        if batch:
+            await _insert_batch(conn, cursor, batch, result)
+    return result
+
+def _filtered_query(user, account_id, category, start_date, end_date, search, archived=False):
+    table = archive.ARCHIVED["transactions"] if archived else "transactions"
+    query = f"SELECT {archive.select_columns('transactions', 't')} FROM {table} t WHERE t.user_id = %s"
+    params = [user["id"]]
+    if account_id:
+        query += " AND t.account_id = %s"
+        params.append(account_id)
+    if category:
+        query += " AND t.category = %s"
+        params.append(category)
+    if start_date:
+        query += " AND t.date >= %s"
+        params.append(start_date)
+    if end_date:
+        query += " AND t.date <= %s"
+        params.append(end_date)
+    if search:
+        clause, clause_params = search_condition(search, SEARCH_COLUMNS, fulltext=not archived)
+        query += " AND " + clause
+        params.extend(clause_params)
+    return query, params
 
 @router.get("/", response_model=List[Transaction])
-def get_transactions(
+async def get_transactions(
+    response: Response,
     user=Depends(get_current_user),
+    conn=Depends(get_db),
     account_id: Optional[int] = None,
     category: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     search: Optional[str] = None,
+    sort: str = SortParam,
+    page_cursor: Optional[str] = CursorParam,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        query = "SELECT t.* FROM transactions t JOIN accounts a ON t.account_id = a.id WHERE a.user_id = %s"
-        params = [user["id"]]
-        if account_id:
-            query += " AND t.account_id = %s"
-            params.append(account_id)
-        if category:
-            query += " AND t.category = %s"
-            params.append(category)
-        if start_date:
-            query += " AND t.date >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND t.date <= %s"
-            params.append(end_date)
-        if search:
-            query += " AND (t.description LIKE %s OR t.category LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%"])
-        query += " ORDER BY t.date DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        return [Transaction(**row) for row in rows]
+    async with conn.cursor(DictCursor) as cursor:
+        query, params = _filtered_query(user, account_id, category, start_date, end_date, search)
+        rank, rank_params = relevance_order(search, SEARCH_COLUMNS) if search and sort == "relevance" else (None, [])
+        if rank:
+            # Ranking needs the FULLTEXT index, which only the live table has
+            query += f" ORDER BY {rank}, t.id DESC LIMIT %s OFFSET %s"
+            params.extend([*rank_params, limit, offset])
+        else:
+            archive_query, archive_params = _filtered_query(user, account_id, category, start_date, end_date, search, archived=True)
+            if page_cursor:
+                clause, clause_params = keyset_condition(page_cursor, "t.id", "t.date")
+                query += " AND " + clause
+                params.extend(clause_params)
+                archive_query += " AND " + clause
+                archive_params.extend(clause_params)
+            query, params = archive.tiered_page(query, params, archive_query, archive_params, "date DESC, id DESC", limit, 0 if page_cursor else offset)
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
+        if not rank:
+            set_next_cursor(response, rows, limit, "date")
+        return rows_response(Transaction, rows, response)
 
-@router.get("/{tx_id}", response_model=Transaction)
-def get_transaction(tx_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute("""
-            SELECT t.* FROM transactions t
-            JOIN accounts a ON t.account_id = a.id
-            WHERE t.id=%s AND a.user_id=%s
-        """, (tx_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Transaction not found")
-        return Transaction(**row)
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
 
-@router.put("/{tx_id}", response_model=bool)
-def update_transaction(tx_id: int, tx: Transaction, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        # Ensure ownership
-        cursor.execute("SELECT t.id FROM transactions t JOIN accounts a ON t.account_id = a.id WHERE t.id=%s AND a.user_id=%s", (tx_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Transaction not found or not authorized")
-        cursor.execute(
-            "UPDATE transactions SET account_id=%s, amount=%s, date=%s, description=%s, category=%s, currency=%s WHERE id=%s",
-            (tx.account_id, tx.amount, tx.date, tx.description, tx.category, tx.currency, tx_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
 
-@router.delete("/{tx_id}", response_model=bool)
-def delete_transaction(tx_id: int, user=Depends(get_current_user)):
-    conn = create_mysql_connection()
-    with conn.cursor() as cursor:
-        # Ensure ownership
-        cursor.execute("SELECT t.id FROM transactions t JOIN accounts a ON t.account_id = a.id WHERE t.id=%s AND a.user_id=%s", (tx_id, user["id"]))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Transaction not found or not authorized")
-        cursor.execute("DELETE FROM transactions WHERE id=%s", (tx_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+async def _stream_export(query, params, fmt):
+    # The request's get_db connection is released before a streaming body runs, so take our own
+    conn = await pool.acquire()
+    completed = False
+    try:
+        # Not `async with`: closing an unbuffered cursor drains the rest of its result
+        cursor = await conn.cursor(SSDictCursor)
+        await cursor.execute(query, params)
+        if fmt == "csv":
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+        while True:
+            rows = await cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            if fmt == "csv":
+                out = io.StringIO()
+                writer = csv.writer(out)
+                writer.writerows([_csv_value(row[col]) for col in EXPORT_COLUMNS] for row in rows)
+                yield out.getvalue()
+            else:
+                yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+        await cursor.close()
+        completed = True
+    finally:
+        # An abandoned stream closes the connection instead of draining the result; the cursor is dropped
+        if not completed:
+            conn.close()
+        await pool.release(conn)
+
+@router.get("/export")
+async def export_transactions(
+    user=Depends(get_current_user),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    account_id: Optional[int] = None,
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    search: Optional[str] = None
+):
+    """
+    Stream every matching transaction as NDJSON or CSV using an unbuffered server-side cursor,
+    so memory use stays flat regardless of history size. Accepts the same filters as the list endpoint.
+    """
+    query, params = _filtered_query(user, account_id, category, start_date, end_date, search)
+    archive_query, archive_params = _filtered_query(user, account_id, category, start_date, end_date, search, archived=True)
+    query = f"{query} UNION ALL {archive_query} ORDER BY date DESC, id DESC"
+    params.extend(archive_params)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(query, tuple(params), format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
 
 @router.get("/summary", response_model=List[Dict[str, Any]])
-def get_transactions_summary(user=Depends(get_current_user), start_date: Optional[str] = None, end_date: Optional[str] = None):
+async def get_transactions_summary(
+    user=Depends(get_current_user),
+    conn=Depends(get_db),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    granularity: str = Query("day", pattern="^(day|month)$"),
+    account_id: Optional[int] = None,
+    category: Optional[str] = None
+):
     """
-    Returns a list of {date, amount} for expenses (negative transactions) grouped by date for the current user.
+    Returns a list of {date, amount} totals per day (or per month, keyed by its first day) for the current user.
+    Reads the precomputed rollup tables; monthly buckets always cover whole months.
     """
-    conn = create_mysql_connection()
-    with conn.cursor(dictionary=True) as cursor:
-        query = """
-            SELECT t.date, SUM(t.amount) as amount
-            FROM transactions t
-            JOIN accounts a ON t.account_id = a.id
-            WHERE a.user_id = %s
-        """
-        params = [user["id"]]
-        if start_date:
-            query += " AND t.date >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND t.date <= %s"
-            params.append(end_date)
-        query += " GROUP BY t.date ORDER BY t.date ASC"
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
+    async with conn.cursor(DictCursor) as cursor:
+        query, params = rollups.summary_query(user["id"], granularity, start_date, end_date, account_id, category)
+        await cursor.execute(query, tuple(params))
+        rows = await cursor.fetchall()
         # Ensure amounts are floats
         for row in rows:
             row["amount"] = float(row["amount"])
         return rows
+
+@router.get("/{tx_id}", response_model=Transaction)
+async def get_transaction(tx_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor(DictCursor) as cursor:
+        row = await archive.fetch_owned(cursor, "transactions", tx_id, user["id"])
+        if not row:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        return row_response(Transaction, row)
+
+@router.put("/{tx_id}", response_model=bool)
+async def update_transaction(tx_id: int, tx: Transaction, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        # Ensure ownership; lock the row so the derived-state deltas are computed from the value being replaced
+        await cursor.execute("SELECT account_id, category, date, amount FROM transactions WHERE id=%s AND user_id=%s FOR UPDATE", (tx_id, user["id"]))
+        old = await cursor.fetchone()
+        if not old:
+            await archive.reject_archived(cursor, "transactions", tx_id, user["id"], "Transaction")
+            await raise_not_owned(cursor, "transactions", tx_id, user["id"], "Transaction")
+        # Also requires the target account to be the user's
+        updated = await scoped_update(cursor, "transactions", tx_id, user["id"], {
+            "account_id": tx.account_id,
+            "amount": tx.amount,
+            "date": tx.date,
+            "description": tx.description,
+            "category": tx.category,
+            "currency": tx.currency,
+        }, "Transaction")
+        alerts = await _apply_ledger_effects(cursor, added=[(tx.account_id, tx.category, tx.date, tx.amount)], removed=[old])
+        await conn.commit()
+    await budgets.publish(alerts)
+    return updated
+
+@router.delete("/{tx_id}", response_model=bool)
+async def delete_transaction(tx_id: int, user=Depends(get_current_user), conn=Depends(get_db)):
+    async with conn.cursor() as cursor:
+        file_paths = await attachments.lock_transaction_files(cursor, tx_id, user["id"])
+        try:
+            # Ensure ownership
+            await cursor.execute("SELECT account_id, category, date, amount FROM transactions WHERE id=%s AND user_id=%s FOR UPDATE", (tx_id, user["id"]))
+            old = await cursor.fetchone()
+            if not old:
+                await archive.reject_archived(cursor, "transactions", tx_id, user["id"], "Transaction")
+                await raise_not_owned(cursor, "transactions", tx_id, user["id"], "Transaction")
+            # Attachments reference the transaction; only the files locked above may be removed
+            await cursor.execute("DELETE FROM attachments WHERE transaction_id=%s", (tx_id,))
+            await cursor.execute("DELETE FROM transactions WHERE id=%s", (tx_id,))
+            deleted = cursor.rowcount > 0
+            alerts = await _apply_ledger_effects(cursor, removed=[old]) if deleted else []
+            await conn.commit()
+            await attachments.release_files(cursor, file_paths)
+        finally:
+            await attachments.unlock_files(cursor, file_paths)
+    await budgets.publish(alerts)
+    return deleted
@@ -0,0 +1,115 @@
+import os
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+import numpy as np
+
+# --- Installment payment schedules ---
+# An installment is paid monthly from start_date: installment_amount each month, with the
+# last payment covering whatever remains of total_amount. When end_date comes before the
+# amounts run out, the payment in end_date's month settles the remainder. Payments fall on
+# start_date's day of month, clamped to the month's last day. Amounts are integer cents.
+#
+# Schedules are pure functions of the row's terms, so they are memoised on exactly those
+# values: editing any term changes the key and yields a fresh schedule.
+
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", 4096))
+
+
+def cents(amount):
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def _as_date(value):
+    return value if isinstance(value, date) or value is None else date.fromisoformat(str(value))
+
+
+def monthly_dates(first_month, count, day):
+    """
+    `count` dates one month apart from first_month, on `day` clamped to each month's last day.
+    """
+    months = np.datetime64(first_month, "M") + np.arange(count)
+    first_days = months.astype("datetime64[D]")
+    last_day = ((months + 1).astype("datetime64[D]") - first_days).astype(np.int64) - 1
+    return first_days + np.minimum(day - 1, last_day)
+
+
+def next_occurrence(anchor, on_or_after):
+    """
+    The first date on anchor's day of month (clamped) that is on or after both anchor and
+    on_or_after: the current cycle of a monthly payment due from anchor on.
+    """
+    floor = np.datetime64(max(_as_date(anchor), on_or_after), "D")
+    dates = monthly_dates(floor, 2, _as_date(anchor).day)
+    return dates[dates >= floor][0].item()
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def _schedule(total_cents, installment_cents, start_date, end_date):
+    if total_cents <= 0 or installment_cents <= 0 or start_date is None:
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    count = -(-total_cents // installment_cents)
+    first_month = np.datetime64(start_date, "M")
+    if end_date is not None:
+        count = max(1, min(count, int(np.datetime64(end_date, "M") - first_month) + 1))
+    dates = monthly_dates(first_month, count, start_date.day)
+    amounts = np.full(count, installment_cents, dtype=np.int64)
+    amounts[-1] = total_cents - installment_cents * (count - 1)
+    remaining = total_cents - np.cumsum(amounts)
+    for array in (dates, amounts, remaining):
+        # Shared between callers through the cache
+        array.flags.writeable = False
+    return dates, amounts, remaining
+
+
+def schedule_arrays(row):
+    """
+    (dates, amounts, remaining) arrays for an installments row; amounts are in cents.
+    """
+    return _schedule(
+        cents(row["total_amount"]),
+        cents(row["installment_amount"]),
+        _as_date(row["start_date"]),
+        _as_date(row["end_date"]),
+    )
+
+
+def schedule(row, as_of=None):
+    as_of = np.datetime64(as_of or date.today(), "D")
+    dates, amounts, remaining = schedule_arrays(row)
+    paid = dates <= as_of
+    payments = [
+        {"number": number, "date": day, "amount": amount / 100, "remaining": left / 100, "paid": is_paid}
+        for number, (day, amount, left, is_paid) in enumerate(
+            zip(dates.tolist(), amounts.tolist(), remaining.tolist(), paid.tolist()), start=1
+        )
+    ]
+    paid_cents = int(amounts[paid].sum())
+    return {
+        "installment_id": row["id"],
+        "payments": payments,
+        "paid_amount": paid_cents / 100,
+        "remaining_amount": (int(amounts.sum()) - paid_cents) / 100,
+    }
+
+
+def monthly_projection(rows, start_date, months):
+    """
+    Total installment payments due in each of `months` months from start_date, across rows.
+    """
+    first_month = np.datetime64(start_date, "M")
+    schedules = [schedule_arrays(row) for row in rows]
+    totals = np.zeros(months, dtype=np.int64)
+    counts = np.zeros(months, dtype=np.int64)
+    if schedules:
+        dates = np.concatenate([s[0] for s in schedules])
+        amounts = np.concatenate([s[1] for s in schedules])
+        index = (dates.astype("datetime64[M]") - first_month).astype(np.int64)
+        in_range = (index >= 0) & (index < months)
+        totals = np.bincount(index[in_range], weights=amounts[in_range], minlength=months).astype(np.int64)
+        counts = np.bincount(index[in_range], minlength=months)
+    month_starts = (first_month + np.arange(months)).astype("datetime64[D]").tolist()
+    return [
+        {"month": month, "amount": total / 100, "payments": count}
+        for month, total, count in zip(month_starts, totals.tolist(), counts.tolist())
+    ]
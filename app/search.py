@@ -0,0 +1,44 @@
+import os
+import re
+from fastapi import Query
+
+# --- Full-text search over FULLTEXT-indexed text columns ---
+# Search terms are split into word tokens and matched in BOOLEAN MODE as `+token*`, so every
+# token must appear, either whole or as a word prefix. Tokens shorter than the server's
+# innodb_ft_min_token_size are not indexed; such searches fall back to a LIKE scan.
+
+FT_MIN_TOKEN_SIZE = int(os.getenv("FT_MIN_TOKEN_SIZE", 3))
+
+SortParam = Query("date", pattern="^(date|relevance)$", description="relevance ranks full-text matches for `search`; it pages with offset only")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _boolean_query(term):
+    tokens = _TOKEN.findall(term or "")
+    if not tokens or any(len(token) < FT_MIN_TOKEN_SIZE for token in tokens):
+        return None
+    return " ".join(f"+{token}*" for token in tokens)
+
+
+def search_condition(term, columns, fulltext=True):
+    """
+    WHERE fragment and params matching term against columns, using the FULLTEXT index when possible.
+    Pass fulltext=False for tables without one (the partitioned archive tables).
+    """
+    against = _boolean_query(term) if fulltext else None
+    if against is None:
+        clause = " OR ".join(f"{column} LIKE %s" for column in columns)
+        return f"({clause})", [f"%{term}%"] * len(columns)
+    return f"MATCH({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)", [against]
+
+
+def relevance_order(term, columns):
+    """
+    ORDER BY expression and params ranking rows by full-text relevance, or (None, []) when
+    the term cannot use the index and there is no score to rank by.
+    """
+    against = _boolean_query(term)
+    if against is None:
+        return None, []
+    return f"MATCH({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE) DESC", [against]
@@ -0,0 +1,538 @@
+import os
+import re
+import sqlite3
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache, partial
+from pymysql import err
+from app import rollups, budgets
+from app.migrations import JOB_LEASES_SQL
+
+# --- Embedded SQLite backend (DB_BACKEND=sqlite) ---
+# Lets the API, benchmarks and tests run without a MySQL server. Each pooled connection owns
+# one sqlite3 connection and the single thread it runs on, and mimics the slice of the aiomysql
+# connection/cursor API the app uses, raising PyMySQL's exception classes. The database runs in
+# WAL mode so readers never wait for the writer. Statements are translated from the MySQL
+# dialect once per distinct SQL string; sqlite3's per-connection cache then keeps them prepared.
+# A write (or SELECT ... FOR UPDATE) begins the transaction with BEGIN IMMEDIATE, taking the
+# write lock up front; plain reads run outside it. Money is stored as REAL and read as float.
+# The schema is created directly at its latest shape; app.migrations and app.archive's
+# partition management stay MySQL-only.
+
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "finance.sqlite3"))
+DB_SQLITE_BUSY_TIMEOUT = float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", 10))
+DB_SQLITE_STATEMENT_CACHE = int(os.getenv("DB_SQLITE_STATEMENT_CACHE", 512))
+DB_SQLITE_CACHE_KB = int(os.getenv("DB_SQLITE_CACHE_KB", 65536))
+
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at DATETIME DEFAULT (datetime('now', 'localtime')),
+    data_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    type VARCHAR(50),
+    balance DECIMAL(15,2) DEFAULT 0.00,
+    currency VARCHAR(10) DEFAULT 'USD',
+    user_id INTEGER,
+    opening_balance DECIMAL(15,2) NOT NULL DEFAULT 0.00
+);
+CREATE INDEX IF NOT EXISTS idx_accounts_user_id ON accounts (user_id, id);
+
+CREATE TABLE IF NOT EXISTS credit_cards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    card_number VARCHAR(30),
+    limit_amount DECIMAL(15,2),
+    balance DECIMAL(15,2) DEFAULT 0.00,
+    due_date DATE,
+    user_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_credit_cards_account ON credit_cards (account_id, id);
+CREATE INDEX IF NOT EXISTS idx_credit_cards_user ON credit_cards (user_id, id);
+
+CREATE TABLE IF NOT EXISTS income (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    amount DECIMAL(15,2) NOT NULL,
+    date DATE NOT NULL,
+    source VARCHAR(100),
+    user_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_income_account_date ON income (account_id, date, id);
+CREATE INDEX IF NOT EXISTS idx_income_user_date ON income (user_id, date, id);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    amount DECIMAL(15,2) NOT NULL,
+    date DATE NOT NULL,
+    description VARCHAR(255),
+    category VARCHAR(100),
+    currency VARCHAR(10) DEFAULT 'USD',
+    user_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions (account_id, date, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_category_date ON transactions (account_id, category, date, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date, id);
+
+CREATE TABLE IF NOT EXISTS monthly_payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    amount DECIMAL(15,2) NOT NULL,
+    due_date DATE,
+    description VARCHAR(255),
+    user_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_monthly_payments_account_due ON monthly_payments (account_id, due_date, id);
+CREATE INDEX IF NOT EXISTS idx_monthly_payments_due ON monthly_payments (due_date, id);
+CREATE INDEX IF NOT EXISTS idx_monthly_payments_user_due ON monthly_payments (user_id, due_date, id);
+
+CREATE TABLE IF NOT EXISTS installments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    total_amount DECIMAL(15,2) NOT NULL,
+    installment_amount DECIMAL(15,2) NOT NULL,
+    start_date DATE,
+    end_date DATE,
+    description VARCHAR(255),
+    user_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_installments_account_start ON installments (account_id, start_date, id);
+CREATE INDEX IF NOT EXISTS idx_installments_user_start ON installments (user_id, start_date, id);
+
+CREATE TABLE IF NOT EXISTS budgets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    account_id INTEGER REFERENCES accounts(id),
+    category VARCHAR(100),
+    amount DECIMAL(12,2) NOT NULL,
+    period VARCHAR(20) DEFAULT 'monthly',
+    currency VARCHAR(10) DEFAULT 'USD',
+    created_at DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_budgets_user ON budgets (user_id, id);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    monthly_payment_id INTEGER REFERENCES monthly_payments(id),
+    message VARCHAR(255),
+    notified_at DATETIME DEFAULT (datetime('now', 'localtime')),
+    is_read BOOLEAN DEFAULT FALSE,
+    cycle DATE,
+    budget_id INTEGER,
+    user_id INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_payment_cycle ON notifications (monthly_payment_id, cycle);
+CREATE INDEX IF NOT EXISTS idx_notifications_budget ON notifications (budget_id, cycle);
+CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications (user_id, id);
+
+CREATE TABLE IF NOT EXISTS attachments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    transaction_id INTEGER NOT NULL REFERENCES transactions(id),
+    file_name VARCHAR(255) NOT NULL,
+    file_path VARCHAR(255) NOT NULL,
+    uploaded_at DATETIME DEFAULT (datetime('now', 'localtime')),
+    size BIGINT,
+    content_type VARCHAR(100)
+);
+CREATE INDEX IF NOT EXISTS idx_attachments_file_path ON attachments (file_path);
+
+CREATE TABLE IF NOT EXISTS transactions_archive (
+    id INTEGER NOT NULL,
+    account_id INTEGER,
+    user_id INTEGER,
+    amount DECIMAL(15,2) NOT NULL,
+    date DATE NOT NULL,
+    description VARCHAR(255),
+    category VARCHAR(100),
+    currency VARCHAR(10) DEFAULT 'USD',
+    PRIMARY KEY (id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_archive_user_date ON transactions_archive (user_id, date, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_archive_account_date ON transactions_archive (account_id, date, id);
+
+CREATE TABLE IF NOT EXISTS income_archive (
+    id INTEGER NOT NULL,
+    account_id INTEGER,
+    user_id INTEGER,
+    amount DECIMAL(15,2) NOT NULL,
+    date DATE NOT NULL,
+    source VARCHAR(100),
+    PRIMARY KEY (id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_income_archive_user_date ON income_archive (user_id, date, id);
+CREATE INDEX IF NOT EXISTS idx_income_archive_account_date ON income_archive (account_id, date, id);
+''' + ";\n".join(rollups.ROLLUP_TABLES_SQL + budgets.BUDGET_TABLES_SQL + [JOB_LEASES_SQL])
+
+
+# Values in: Decimal as REAL, dates as ISO text (space-separated, like MySQL's NOW())
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+
+
+def _convert(parse):
+    def convert(value):
+        text = value.decode()
+        try:
+            return parse(text)
+        except ValueError:
+            return text
+    return convert
+
+
+# Values out, by declared column type
+sqlite3.register_converter("DATE", _convert(lambda text: date.fromisoformat(text[:10])))
+sqlite3.register_converter("DATETIME", _convert(datetime.fromisoformat))
+sqlite3.register_converter("DECIMAL", _convert(float))
+sqlite3.register_converter("BOOLEAN", _convert(lambda text: bool(int(text))))
+
+
+# --- MySQL functions the app's SQL uses ---
+
+def _parse_date(value):
+    if value is None or isinstance(value, (date, datetime)):
+        return value
+    text = str(value)
+    return datetime.fromisoformat(text) if len(text) > 10 else date.fromisoformat(text)
+
+
+def _format_date(value):
+    if isinstance(value, datetime):
+        return value.isoformat(" ", "seconds")
+    return value.isoformat()
+
+
+_UNITS = {"SECOND": "seconds", "MINUTE": "minutes", "HOUR": "hours", "DAY": "days"}
+
+
+def _date_add(value, amount, unit, sign=1):
+    value = _parse_date(value)
+    if value is None or amount is None:
+        return None
+    if unit != "DAY" and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return _format_date(value + timedelta(**{_UNITS[unit]: sign * float(amount)}))
+
+
+def _date_part(part):
+    def function(value):
+        value = _parse_date(value)
+        return None if value is None else part(value)
+    return function
+
+
+def _makedate(year, day_of_year):
+    if year is None or day_of_year is None or int(day_of_year) < 1:
+        return None
+    return (date(int(year), 1, 1) + timedelta(days=int(day_of_year) - 1)).isoformat()
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _match_against(query, *values):
+    """
+    MATCH(...) AGAINST (query IN BOOLEAN MODE) for the `+token*` queries app.search builds:
+    0 unless every required token matches a word (as a prefix when starred), else the hit count.
+    """
+    words = _WORD.findall(" ".join(value for value in values if value).lower())
+    score = 0
+    for term in (query or "").split():
+        token = term.strip("+*").lower()
+        hits = sum(1 for word in words if (word.startswith(token) if term.endswith("*") else word == token))
+        if term.startswith("+") and not hits:
+            return 0
+        score += hits
+    return score
+
+
+# GET_LOCK/RELEASE_LOCK: process-wide named locks, enough for a single-process SQLite deployment.
+# Every connection runs on its own thread, so a re-entrant lock is held per connection as in MySQL.
+_named_locks = {}
+_named_locks_guard = threading.Lock()
+
+
+def _get_lock(name, timeout):
+    with _named_locks_guard:
+        lock = _named_locks.setdefault(name, threading.RLock())
+    timeout = float(timeout or 0)
+    acquired = lock.acquire(timeout=timeout) if timeout > 0 else lock.acquire(blocking=timeout < 0)
+    return 1 if acquired else 0
+
+
+def _release_lock(name):
+    lock = _named_locks.get(name)
+    if lock is None:
+        return None
+    try:
+        lock.release()
+    except RuntimeError:
+        # Held by another connection
+        return 0
+    return 1
+
+
+def _register_functions(db):
+    db.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    db.create_function("NOW", 0, lambda: _format_date(datetime.now()))
+    db.create_function("DATE_ADD", 3, _date_add, deterministic=True)
+    db.create_function("DATE_SUB", 3, lambda value, amount, unit: _date_add(value, amount, unit, -1), deterministic=True)
+    db.create_function("YEAR", 1, _date_part(lambda value: value.year), deterministic=True)
+    db.create_function("DAYOFMONTH", 1, _date_part(lambda value: value.day), deterministic=True)
+    db.create_function("WEEKDAY", 1, _date_part(lambda value: value.weekday()), deterministic=True)
+    db.create_function("MAKEDATE", 2, _makedate, deterministic=True)
+    db.create_function("MATCH_AGAINST", -1, _match_against, deterministic=True)
+    db.create_function("GET_LOCK", 2, _get_lock)
+    db.create_function("RELEASE_LOCK", 1, _release_lock)
+
+
+# --- Dialect translation ---
+
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.I)
+_MATCH = re.compile(r"MATCH\(([^()]*)\)\s*AGAINST\s*\(\s*%s\s+IN\s+BOOLEAN\s+MODE\s*\)", re.I)
+_INTERVAL = re.compile(r"INTERVAL\s+(.+?)\s+(SECOND|MINUTE|HOUR|DAY)\b", re.I | re.S)
+_IF = re.compile(r"\bIF\(", re.I)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_NO_OP_UPDATE = re.compile(r"^\s*(\w+)\s*=\s*\1\s*$")
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.I)
+_UPDATE_ALIAS = re.compile(r"^\s*UPDATE\s+(\w+)\s+(?!SET\b)(\w+)\s+SET\s+(.+)$", re.I | re.S)
+_UPDATE_JOIN = re.compile(r"^\s*UPDATE\s+(\w+)\s+(\w+)\s+JOIN\s+(\w+)\s+(\w+)\s+ON\s+(.+?)\s+SET\s+(.+?)\s+WHERE\s+(.+)$", re.I | re.S)
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """
+    Rewrite one MySQL statement for SQLite. Returns (sql, writes), where writes tells whether
+    the statement needs the write lock.
+    """
+    writes = sql.lstrip().split(None, 1)[0].upper() in _WRITES
+    if _FOR_UPDATE.search(sql):
+        sql, writes = _FOR_UPDATE.sub("", sql), True
+    sql = _MATCH.sub(r"MATCH_AGAINST(%s, \1)", sql)
+    sql = _INTERVAL.sub(lambda m: f"{m.group(1)}, '{m.group(2).upper()}'", sql)
+    sql = _IF.sub("iif(", sql)
+    parts = _ON_DUPLICATE.split(sql, 1)
+    if len(parts) == 2:
+        insert, assignments = parts
+        if _NO_OP_UPDATE.match(assignments):
+            sql = f"{insert}ON CONFLICT DO NOTHING"
+        else:
+            assignments = _VALUES_REF.sub(r"excluded.\1", assignments)
+            sql = f"{insert}ON CONFLICT DO UPDATE SET {assignments}"
+    match = _UPDATE_JOIN.match(sql)
+    if match:
+        table, alias, joined, joined_alias, on, assignments, where = match.groups()
+        if "%s" in on:
+            raise ValueError("UPDATE ... JOIN with parameters in ON cannot be reordered for SQLite")
+        # SQLite's UPDATE ... FROM takes the joined table after SET, and unqualified targets
+        assignments = re.sub(rf"\b{alias}\.(\w+)\s*=", r"\1 =", assignments)
+        sql = f"UPDATE {table} AS {alias} SET {assignments} FROM {joined} AS {joined_alias} WHERE ({on}) AND ({where})"
+    else:
+        match = _UPDATE_ALIAS.match(sql)
+        if match:
+            table, alias, rest = match.groups()
+            sql = f"UPDATE {table} AS {alias} SET " + re.sub(rf"\b{alias}\.(\w+)\s*=", r"\1 =", rest)
+    return sql.replace("%s", "?").replace("%%", "%"), writes
+
+
+def _integrity_errno(e, sql):
+    message = str(e)
+    if message.startswith("FOREIGN KEY"):
+        # SQLite does not say which side failed: a DELETE removes a referenced row (1451),
+        # anything else points at a missing one (1452)
+        return 1451 if sql.lstrip()[:6].upper() == "DELETE" else 1452
+    if message.startswith("NOT NULL"):
+        return 1048
+    return 1062
+
+
+def _error(e, sql=""):
+    # Surface PyMySQL's exception classes and error codes so `except Error` and friends keep working
+    if isinstance(e, sqlite3.IntegrityError):
+        return err.IntegrityError(_integrity_errno(e, sql), str(e))
+    if isinstance(e, sqlite3.OperationalError):
+        return err.OperationalError(2013, str(e))
+    if isinstance(e, sqlite3.ProgrammingError):
+        return err.ProgrammingError(1064, str(e))
+    return err.DatabaseError(1105, str(e))
+
+
+def _params(args):
+    if args is None:
+        return ()
+    return tuple(args)
+
+
+class Cursor:
+    def __init__(self, connection, dict_rows):
+        self._connection = connection
+        self._dict_rows = dict_rows
+        self._cursor = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def __await__(self):
+        # `cursor = await conn.cursor()` as with aiomysql
+        yield from ()
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _prepare(self, sql):
+        sql, writes = translate(sql)
+        db = self._connection._db
+        if self._cursor is not None:
+            # Finish the previous statement first: a pending read would pin a stale snapshot
+            self._cursor.close()
+        if writes and not db.in_transaction:
+            db.execute("BEGIN IMMEDIATE")
+        self._cursor = db.cursor()
+        return sql
+
+    def _finish(self):
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        self.description = self._cursor.description
+
+    def _execute(self, sql, args):
+        sql = self._prepare(sql)
+        try:
+            self._cursor.execute(sql, _params(args))
+        except sqlite3.IntegrityError as e:
+            raise _error(e, sql) from e
+        self._finish()
+        return self.rowcount
+
+    def _executemany(self, sql, seq):
+        sql = self._prepare(sql)
+        try:
+            self._cursor.executemany(sql, [_params(args) for args in seq])
+        except sqlite3.IntegrityError as e:
+            raise _error(e, sql) from e
+        self._finish()
+        return self.rowcount
+
+    def _rows(self, rows):
+        if not self._dict_rows:
+            return rows
+        names = [column[0] for column in self.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    async def execute(self, query, args=None):
+        return await self._connection._run(self._execute, query, args)
+
+    async def executemany(self, query, args):
+        return await self._connection._run(self._executemany, query, list(args))
+
+    async def fetchone(self):
+        row = await self._connection._run(self._cursor.fetchone)
+        return None if row is None else self._rows([row])[0]
+
+    async def fetchmany(self, size=None):
+        return self._rows(await self._connection._run(self._cursor.fetchmany, size or self._cursor.arraysize))
+
+    async def fetchall(self):
+        return self._rows(await self._connection._run(self._cursor.fetchall))
+
+    async def close(self):
+        if self._cursor is not None and not self._connection.closed:
+            await self._connection._run(self._cursor.close)
+        self._cursor = None
+
+
+class Connection:
+    """
+    One sqlite3 connection, used only from its own worker thread. sqlite3 objects must not be
+    returned to the event loop: a cursor freed there blocks the loop on the connection's mutex.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    def _open(self):
+        self._db = sqlite3.connect(
+            self.path,
+            timeout=DB_SQLITE_BUSY_TIMEOUT,
+            isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=DB_SQLITE_STATEMENT_CACHE,
+            check_same_thread=False,
+        )
+        for pragma in (
+            "journal_mode = WAL",
+            "synchronous = NORMAL",
+            "foreign_keys = ON",
+            "temp_store = MEMORY",
+            f"cache_size = -{DB_SQLITE_CACHE_KB}",
+        ):
+            self._db.execute(f"PRAGMA {pragma}")
+        _register_functions(self._db)
+
+    async def _run(self, fn, *args):
+        def call():
+            try:
+                return fn(*args)
+            except sqlite3.Error as e:
+                raise _error(e) from e
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    @property
+    def closed(self):
+        return self._db is None
+
+    def cursor(self, cursor_class=None):
+        # aiomysql's DictCursor and SSDictCursor both carry dict_type
+        return Cursor(self, hasattr(cursor_class, "dict_type"))
+
+    def get_transaction_status(self):
+        return self._db.in_transaction
+
+    async def commit(self):
+        await self._run(self._db.commit)
+
+    async def rollback(self):
+        await self._run(self._db.rollback)
+
+    def _ping(self):
+        self._db.execute("SELECT 1").close()
+
+    async def ping(self, reconnect=False):
+        if self.closed:
+            raise err.InterfaceError(0, "Connection is closed")
+        await self._run(self._ping)
+
+    def close(self):
+        if self._db is not None:
+            db, self._db = self._db, None
+            self._executor.submit(db.close)
+        self._executor.shutdown(wait=False)
+
+
+async def connect(path=DB_SQLITE_PATH):
+    connection = Connection(path)
+    await connection._run(connection._open)
+    return connection
+
+
+async def create_schema(conn):
+    await conn._run(lambda: conn._db.executescript(SCHEMA_SQL).close())
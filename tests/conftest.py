@@ -0,0 +1,84 @@
+import os
+import tempfile
+import itertools
+
+# The app reads its settings at import time: point it at a throwaway SQLite database first
+_tmp = tempfile.mkdtemp(prefix="finance-tests-")
+os.environ.update({
+    "DB_BACKEND": "sqlite",
+    "DB_SQLITE_PATH": os.path.join(_tmp, "finance.sqlite3"),
+    "ATTACHMENTS_DIR": os.path.join(_tmp, "attachments"),
+    "SECRET_KEY": "test-secret",
+    "NOTIFY_SCHEDULER": "0",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import pooled_connection
+from app.routers.login import create_access_token
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def run(client, fn, *args):
+    """
+    Run an async helper on the app's event loop, where the connection pool lives.
+    """
+    return client.portal.call(fn, *args)
+
+
+async def _create_user(username):
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                (username, f"{username}@example.com", "x")
+            )
+            user_id = cursor.lastrowid
+        await conn.commit()
+    return user_id
+
+
+@pytest.fixture
+def make_user(client):
+    """
+    Create a user directly in the database; returns (user_id, auth headers).
+    """
+    def make():
+        username = f"user{next(_usernames)}"
+        user_id = run(client, _create_user, username)
+        return user_id, {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def other_user(make_user):
+    return make_user()
+
+
+def create(client, headers, path, body):
+    response = client.post(path, json={"id": None, **body}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def create_account(client, headers, balance=0):
+    return create(client, headers, "/v1/accounts/", {"name": "Checking", "type": "checking", "balance": balance})
+
+
+def create_transaction(client, headers, account_id, amount, day, category="food"):
+    return create(client, headers, "/v1/transactions/", {
+        "account_id": account_id, "amount": amount, "date": day.isoformat(), "description": "test", "category": category,
+    })
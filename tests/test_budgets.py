@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+from app import budgets
+from tests.conftest import create, create_account, create_transaction
+
+
+def _budget(client, headers, period="monthly", category="food", account_id=None, amount=100):
+    return create(client, headers, "/v1/budgets/", {
+        "account_id": account_id, "category": category, "amount": amount, "period": period, "created_at": None,
+    })
+
+
+def _status(client, headers, budget_id):
+    status = client.get(f"/v1/budgets/{budget_id}/status", headers=headers).json()
+    return status["spent"], status["over_budget"]
+
+
+def test_periods_count_only_their_own_window(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    today = date.today()
+    weekly, monthly, yearly = (_budget(client, headers, period) for period in budgets.PERIODS)
+    create_transaction(client, headers, account_id, 10, today)
+    # Outside every current period
+    create_transaction(client, headers, account_id, 7, today.replace(year=today.year - 1))
+
+    assert [_status(client, headers, budget_id)[0] for budget_id in (weekly, monthly, yearly)] == [10, 10, 10]
+    assert client.get(f"/v1/budgets/{weekly}/status", headers=headers).json()["period_start"] == budgets.period_start("weekly").isoformat()
+
+
+def test_category_and_account_scoping(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    other_account = create_account(client, headers)
+    food = _budget(client, headers, category="Food")
+    everything = _budget(client, headers, category=None)
+    other_only = _budget(client, headers, category=None, account_id=other_account)
+    today = date.today()
+
+    create_transaction(client, headers, account_id, 30, today, category="Food")
+    create_transaction(client, headers, account_id, 5, today, category="rent")
+    assert _status(client, headers, food) == (30, False)
+    assert _status(client, headers, everything) == (35, False)
+    assert _status(client, headers, other_only) == (0, False)
+
+    create_transaction(client, headers, other_account, 120, today, category="rent")
+    assert _status(client, headers, food) == (30, False)
+    assert _status(client, headers, other_only) == (120, True)
+
+
+def test_over_budget_rearms_after_dropping_under(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    budget_id = _budget(client, headers, amount=50)
+    today = date.today()
+
+    tx_id = create_transaction(client, headers, account_id, 60, today)
+    client.delete(f"/v1/transactions/{tx_id}", headers=headers)
+    create_transaction(client, headers, account_id, 55, today)
+    assert [n["budget_id"] for n in client.get("/v1/notifications/", headers=headers).json()] == [budget_id, budget_id]
+    assert _status(client, headers, budget_id) == (55, True)
+
+
+def test_spend_outside_a_period_leaves_it_alone(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    budget_id = _budget(client, headers, period="weekly", amount=10)
+    create_transaction(client, other_headers, create_account(client, other_headers), 500, date.today())
+    create_transaction(client, headers, create_account(client, headers), 500, date.today() - timedelta(days=8))
+    assert _status(client, headers, budget_id) == (0, False)
+    # Last week's spend went over last week's period, not this one
+    notifications = client.get("/v1/notifications/", headers=headers).json()
+    assert [n["budget_id"] for n in notifications] == [budget_id]
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+from app import forecast
+from tests.conftest import create, create_account
+
+
+def _forecast(client, headers, **params):
+    response = client.get("/v1/forecast/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_forecast_projects_each_flow():
+    accounts = [{"id": 1, "balance": 100}, {"id": 2, "balance": 0}]
+    income = [
+        {"account_id": 1, "source": "salary", "amount": 1000, "date": date(2024, 1, 25)},
+        {"account_id": 1, "source": "salary", "amount": 1000, "date": date(2024, 2, 25)},
+        # Seen in one month only: not recurring
+        {"account_id": 1, "source": "gift", "amount": 500, "date": date(2024, 2, 1)},
+    ]
+    payments = [{"account_id": 1, "amount": 50, "due_date": date(2023, 12, 31)}, {"account_id": 99, "amount": 1, "due_date": date(2024, 1, 1)}]
+    installments = [{"id": 1, "account_id": 2, "total_amount": 60, "installment_amount": 30, "start_date": date(2024, 2, 15), "end_date": None}]
+    cards = [{"account_id": 2, "balance": 200, "due_date": date(2024, 1, 5)}]
+
+    start, account_ids, balances = forecast.forecast(accounts, income, payments, installments, cards, 1, start=date(2024, 3, 10))
+    assert (start, account_ids, balances.shape) == (date(2024, 3, 10), [1, 2], (2, 32))
+    # Salary on Mar 25, the payment clamped to Mar 31
+    assert {day: int(balances[0, day]) for day in (0, 14, 15, 21, 31)} == {0: 10000, 14: 10000, 15: 110000, 21: 105000, 31: 105000}
+    # Installment on Mar 15, the card's statement on its next due date, Apr 5
+    assert {day: int(balances[1, day]) for day in (4, 5, 25, 26, 31)} == {4: 0, 5: -3000, 25: -3000, 26: -23000, 31: -23000}
+
+
+def test_forecast_endpoint_reports_the_lowest_balance(client, user):
+    _, headers = user
+    account_id = create_account(client, headers, balance=100)
+    create(client, headers, "/v1/monthly-payments/", {"account_id": account_id, "amount": 30, "due_date": date.today().isoformat(), "description": "rent"})
+    result = _forecast(client, headers, months=1)
+    (account,) = result["accounts"]
+    assert account["balances"][0] == 70
+    # Paid again on the horizon's last day, which is when the balance bottoms out
+    assert (account["end_balance"], account["min_balance"]) == (40, 40)
+    assert date.fromisoformat(account["min_date"]) == date.fromisoformat(result["start_date"]) + timedelta(days=result["days"] - 1)
+
+
+def test_forecast_account_filter(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    first = create_account(client, headers, balance=100)
+    second = create_account(client, headers, balance=50)
+    other = create_account(client, other_headers, balance=10)
+
+    assert [a["account_id"] for a in _forecast(client, headers)["accounts"]] == [first, second]
+    accounts = _forecast(client, headers, account_id=second)["accounts"]
+    assert [(a["account_id"], a["end_balance"]) for a in accounts] == [(second, 50)]
+    # Someone else's account is simply not in scope
+    assert _forecast(client, headers, account_id=other)["accounts"] == []
@@ -0,0 +1,64 @@
+from datetime import date
+from app.http_cache import data_version
+from app.importers import iter_csv
+from app.routers import transactions
+from tests.conftest import run, create_account, create_transaction
+
+
+def test_conditional_get(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    first = client.get("/v1/accounts/", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get("/v1/accounts/", headers={**headers, "If-None-Match": etag})
+    assert (cached.status_code, cached.content) == (304, b"")
+    # Another URL has its own tag
+    assert client.get(f"/v1/accounts/{account_id}", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_writes_invalidate_only_their_users_responses(client, user, other_user):
+    user_id, headers = user
+    other_id, other_headers = other_user
+    account_id = create_account(client, headers)
+    etag = client.get("/v1/transactions/", headers=headers).headers["ETag"]
+    other_version = run(client, data_version, other_id)
+
+    create_transaction(client, headers, account_id, 10, date.today())
+    response = client.get("/v1/transactions/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers["ETag"] != etag
+    assert run(client, data_version, other_id) == other_version
+
+
+def test_rejected_writes_do_not_bump(client, user, other_user):
+    user_id, headers = user
+    _, other_headers = other_user
+    other_account = create_account(client, other_headers)
+    version = run(client, data_version, user_id)
+
+    assert client.delete("/v1/transactions/999999", headers=headers).status_code == 404
+    assert client.delete(f"/v1/accounts/{other_account}", headers=headers).status_code == 403
+    assert client.post("/v1/accounts/", json={"name": "x"}, headers=headers).status_code == 422
+    assert run(client, data_version, user_id) == version
+
+
+def test_partially_committed_bulk_import_bumps(client, user, monkeypatch):
+    user_id, headers = user
+    account_id = create_account(client, headers)
+    parts = [f"account_id,amount,date,description\n{account_id},5,2024-01-05,x\n".encode(), b"\xff\n"]
+
+    async def stream():
+        for part in parts:
+            yield part
+
+    # The test client sends one body chunk; split it so the first row is committed before the bad bytes
+    monkeypatch.setattr(transactions, "BULK_CHUNK_SIZE", 1)
+    monkeypatch.setattr(transactions, "iter_csv", lambda _: iter_csv(stream()))
+    version = run(client, data_version, user_id)
+    response = client.post("/v1/transactions/bulk", content=b"".join(parts), headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 400
+    assert "1 row(s)" in response.json()["detail"]
+    assert run(client, data_version, user_id) == version + 1
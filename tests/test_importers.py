@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from app.importers import iter_csv, iter_ndjson, iter_ofx
+from tests.conftest import create_account
+
+OFX = b"""OFXHEADER:100
+<OFX><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000<TRNAMT>-12.50<NAME>Caf\xc3\xa9 Cr\xc3\xa8me</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240106<TRNAMT>-3.00<MEMO>Bus</STMTTRN>
+</BANKTRANLIST></OFX>
+"""
+
+
+def _chunks(body, size):
+    async def chunks():
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+    return chunks()
+
+
+def _parse(parser, body, size=1):
+    async def collect():
+        return [row async for row in parser(_chunks(body, size))]
+    return asyncio.run(collect())
+
+
+def test_csv_keeps_characters_split_across_chunks():
+    body = 'account_id,amount,date,description\n1,4.5,2024-01-05,"Café, crème\nbrûlée"\n'.encode()
+    # One-byte chunks split every multibyte character
+    assert _parse(iter_csv, body) == [
+        (1, {"account_id": "1", "amount": "4.5", "date": "2024-01-05", "description": "Café, crème\nbrûlée"}),
+    ]
+
+
+def test_ndjson_reports_bad_lines_by_number():
+    body = b'{"amount": 1}\n\nnot json\n{"amount": 2}'
+    rows = _parse(iter_ndjson, body, size=4)
+    assert [number for number, _ in rows] == [1, 2, 3]
+    assert rows[1][1]["_error"].startswith("Invalid JSON")
+    assert rows[2][1] == {"amount": 2}
+
+
+def test_ofx_records():
+    assert [record for _, record in _parse(iter_ofx, OFX, size=7)] == [
+        {"amount": "-12.50", "date": "2024-01-05", "description": "Café Crème", "category": None},
+        {"amount": "-3.00", "date": "2024-01-06", "description": "Bus", "category": None},
+    ]
+
+
+@pytest.mark.parametrize("parser", [iter_csv, iter_ndjson, iter_ofx])
+def test_invalid_utf8_is_rejected(parser):
+    with pytest.raises(UnicodeDecodeError):
+        _parse(parser, b"account_id\n\xff\xfe\n")
+    # A character cut off at the end of the body is invalid too
+    with pytest.raises(UnicodeDecodeError):
+        _parse(parser, "account_id\né".encode()[:-1])
+
+
+def test_bulk_import_formats(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    csv_body = f"account_id,amount,date,description\n{account_id},5,2024-01-05,Crème\n{account_id},oops,2024-01-05,x\n".encode()
+    response = client.post("/v1/transactions/bulk", content=csv_body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.json()["inserted"] == 1
+    assert [error["row"] for error in response.json()["errors"]] == [2]
+
+    response = client.post(f"/v1/transactions/bulk?account_id={account_id}", content=OFX, headers={**headers, "Content-Type": "application/x-ofx"})
+    assert response.json() == {"inserted": 2, "failed": 0, "errors": []}
+    descriptions = {row["description"] for row in client.get(f"/v1/transactions/?account_id={account_id}", headers=headers).json()}
+    assert descriptions == {"Crème", "Café Crème", "Bus"}
+
+
+def test_bulk_import_rejects_invalid_utf8(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    body = f"account_id,amount,date,description\n{account_id},5,2024-01-05,\xff\n".encode("latin-1")
+    response = client.post("/v1/transactions/bulk", content=body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 400
+    assert "not valid UTF-8" in response.json()["detail"]
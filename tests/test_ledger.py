@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+from app import balances
+from tests.conftest import run, create, create_account, create_transaction
+
+
+def _balance(client, headers, account_id):
+    return client.get(f"/v1/accounts/{account_id}", headers=headers).json()["balance"]
+
+
+def _summary(client, headers, **params):
+    response = client.get("/v1/transactions/summary", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return {row["date"]: row["amount"] for row in response.json()}
+
+
+def test_balance_follows_income_and_transactions(client, user):
+    _, headers = user
+    account_id = create_account(client, headers, balance=100)
+    other_id = create_account(client, headers)
+    today = date.today()
+
+    income_id = create(client, headers, "/v1/income/", {"account_id": account_id, "amount": 50, "date": today.isoformat(), "source": "salary"})
+    tx_id = create_transaction(client, headers, account_id, 30, today)
+    assert _balance(client, headers, account_id) == 120
+
+    # Moving a transaction to another account moves its effect with it
+    response = client.put(f"/v1/transactions/{tx_id}", json={
+        "id": None, "account_id": other_id, "amount": 45, "date": today.isoformat(), "description": "moved", "category": "food",
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    assert _balance(client, headers, account_id) == 150
+    assert _balance(client, headers, other_id) == -45
+
+    assert client.delete(f"/v1/transactions/{tx_id}", headers=headers).json() is True
+    assert client.delete(f"/v1/income/{income_id}", headers=headers).json() is True
+    assert _balance(client, headers, account_id) == 100
+    assert _balance(client, headers, other_id) == 0
+    assert run(client, balances.reconcile) == []
+
+
+def test_account_update_keeps_ledger_balance(client, user):
+    _, headers = user
+    account_id = create(client, headers, "/v1/accounts/", {"name": "Checking", "type": "checking", "balance": 100, "currency": "EUR"})
+    create_transaction(client, headers, account_id, 30, date.today())
+
+    # A rename leaves out balance and currency: both keep their stored values
+    response = client.put(f"/v1/accounts/{account_id}", json={"id": None, "name": "Renamed", "type": "checking"}, headers=headers)
+    assert response.status_code == 200, response.text
+    account = client.get(f"/v1/accounts/{account_id}", headers=headers).json()
+    assert (account["name"], account["balance"], account["opening_balance"], account["currency"]) == ("Renamed", 70, 100, "EUR")
+
+    # An explicit balance is a manual adjustment of the opening balance
+    client.put(f"/v1/accounts/{account_id}", json={"id": None, "name": "Renamed", "type": "checking", "balance": 50}, headers=headers)
+    account = client.get(f"/v1/accounts/{account_id}", headers=headers).json()
+    assert (account["balance"], account["opening_balance"]) == (50, 80)
+    assert run(client, balances.reconcile) == []
+
+
+def test_bulk_import_updates_balance(client, user):
+    _, headers = user
+    account_id = create_account(client, headers, balance=10)
+    rows = [{"account_id": account_id, "amount": 2.5, "date": date.today().isoformat(), "category": "food"}] * 4
+    response = client.post("/v1/transactions/bulk", json=rows, headers=headers)
+    assert response.status_code == 200, response.text
+    assert _balance(client, headers, account_id) == 0
+
+
+def test_summary_reads_rollups(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    first = date.today().replace(day=1)
+    second = first + timedelta(days=1)
+    create_transaction(client, headers, account_id, 10, first)
+    tx_id = create_transaction(client, headers, account_id, 20, first)
+    create_transaction(client, headers, account_id, 5, second, category="rent")
+    assert _summary(client, headers, start_date=first.isoformat()) == {first.isoformat(): 30, second.isoformat(): 5}
+    assert _summary(client, headers, start_date=first.isoformat(), category="rent") == {second.isoformat(): 5}
+
+    client.delete(f"/v1/transactions/{tx_id}", headers=headers)
+    assert _summary(client, headers, start_date=first.isoformat()) == {first.isoformat(): 10, second.isoformat(): 5}
+    assert _summary(client, headers, granularity="month", start_date=second.isoformat()) == {first.isoformat(): 15}
+
+
+def test_summary_rejects_malformed_dates(client, user):
+    _, headers = user
+    response = client.get("/v1/transactions/summary", params={"granularity": "month", "start_date": "garbage"}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_budget_tracks_spend_and_notifies_once(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    today = date.today()
+    create_transaction(client, headers, account_id, 40, today)
+    budget_id = create(client, headers, "/v1/budgets/", {"account_id": None, "category": "food", "amount": 100, "period": "monthly", "created_at": None})
+
+    # Seeded from existing transactions, then kept up to date
+    assert client.get(f"/v1/budgets/{budget_id}/status", headers=headers).json()["spent"] == 40
+    create_transaction(client, headers, account_id, 25, today, category="rent")
+    tx_id = create_transaction(client, headers, account_id, 70, today)
+    status = client.get(f"/v1/budgets/{budget_id}/status", headers=headers).json()
+    assert (status["spent"], status["over_budget"]) == (110, True)
+    create_transaction(client, headers, account_id, 1, today)
+
+    notifications = client.get("/v1/notifications/", headers=headers).json()
+    assert [n["budget_id"] for n in notifications] == [budget_id]
+
+    client.delete(f"/v1/transactions/{tx_id}", headers=headers)
+    status = client.get("/v1/budgets/status", headers=headers).json()
+    assert [(s["budget_id"], s["spent"], s["over_budget"]) for s in status] == [(budget_id, 41, False)]
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+from app import notifier
+from tests.conftest import run, create, create_account
+
+
+def _payment(client, headers, account_id, due_date):
+    return create(client, headers, "/v1/monthly-payments/", {
+        "account_id": account_id, "amount": 25, "due_date": due_date.isoformat(), "description": "rent",
+    })
+
+
+def _payment_notifications(client, headers, payment_id):
+    return [n for n in client.get("/v1/notifications/", headers=headers).json() if n["monthly_payment_id"] == payment_id]
+
+
+def test_recurring_payment_notifies_current_cycle_once(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    today = date.today()
+    # Due on today's day of month since last year: this month's cycle is today
+    recurring = _payment(client, headers, account_id, today.replace(year=today.year - 1))
+    later = _payment(client, headers, account_id, today + timedelta(days=notifier.NOTIFY_LEAD_DAYS + 5))
+
+    run(client, notifier.generate_due_notifications)
+    run(client, notifier.generate_due_notifications)
+
+    notifications = _payment_notifications(client, headers, recurring)
+    assert [n["cycle"] for n in notifications] == [today.isoformat()]
+    assert today.isoformat() in notifications[0]["message"]
+    assert _payment_notifications(client, headers, later) == []
+    assert [n["id"] for n in client.get("/v1/notifications/due/", headers=headers).json()] == [notifications[0]["id"]]
+
+
+def test_deleting_a_notified_payment(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    payment_id = _payment(client, headers, create_account(client, headers), date.today())
+    run(client, notifier.generate_due_notifications)
+    assert len(_payment_notifications(client, headers, payment_id)) == 1
+
+    assert client.delete(f"/v1/monthly-payments/{payment_id}", headers=other_headers).status_code == 403
+    assert len(_payment_notifications(client, headers, payment_id)) == 1
+    assert client.delete(f"/v1/monthly-payments/{payment_id}", headers=headers).json() is True
+    assert _payment_notifications(client, headers, payment_id) == []
@@ -0,0 +1,92 @@
+from datetime import date
+import pytest
+from pymysql.err import IntegrityError
+from app.database import pooled_connection
+from tests.conftest import run, create, create_account, create_transaction
+
+
+def _transaction(account_id, amount=10):
+    return {"id": None, "account_id": account_id, "amount": amount, "date": date.today().isoformat(), "description": "x", "category": "food"}
+
+
+def test_other_users_transaction_is_forbidden(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    account_id = create_account(client, headers)
+    tx_id = create_transaction(client, headers, account_id, 10, date.today())
+    other_account = create_account(client, other_headers)
+
+    assert client.get(f"/v1/transactions/{tx_id}", headers=other_headers).status_code == 404
+    assert client.put(f"/v1/transactions/{tx_id}", json=_transaction(other_account), headers=other_headers).status_code == 403
+    assert client.delete(f"/v1/transactions/{tx_id}", headers=other_headers).status_code == 403
+    # Nor can the owner move it onto someone else's account
+    assert client.put(f"/v1/transactions/{tx_id}", json=_transaction(other_account), headers=headers).status_code == 403
+    assert client.get(f"/v1/transactions/{tx_id}", headers=headers).json()["account_id"] == account_id
+
+
+def test_missing_rows_are_not_found(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    assert client.put("/v1/transactions/999999", json=_transaction(account_id), headers=headers).status_code == 404
+    assert client.delete("/v1/transactions/999999", headers=headers).status_code == 404
+    assert client.delete("/v1/accounts/999999", headers=headers).status_code == 404
+    assert client.post("/v1/transactions/", json=_transaction(999999), headers=headers).status_code == 404
+
+
+def test_writes_on_other_users_accounts_are_forbidden(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    other_account = create_account(client, other_headers, balance=5)
+    assert client.post("/v1/transactions/", json=_transaction(other_account), headers=headers).status_code == 403
+    income = {"id": None, "account_id": other_account, "amount": 1, "date": date.today().isoformat(), "source": "x"}
+    assert client.post("/v1/income/", json=income, headers=headers).status_code == 403
+    account = {"id": None, "name": "Mine now", "type": "checking", "balance": 0}
+    assert client.put(f"/v1/accounts/{other_account}", json=account, headers=headers).status_code == 403
+    assert client.delete(f"/v1/accounts/{other_account}", headers=headers).status_code == 403
+    assert client.get(f"/v1/accounts/{other_account}", headers=other_headers).json()["balance"] == 5
+
+
+def test_listing_only_shows_own_rows(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    create_transaction(client, other_headers, create_account(client, other_headers), 10, date.today())
+    account_id = create_account(client, headers)
+    tx_id = create_transaction(client, headers, account_id, 10, date.today())
+    assert [row["id"] for row in client.get("/v1/transactions/", headers=headers).json()] == [tx_id]
+    assert [row["id"] for row in client.get("/v1/accounts/", headers=headers).json()] == [account_id]
+
+
+def test_deleting_a_transaction_removes_its_attachments(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    first = create_transaction(client, headers, account_id, 10, date.today())
+    second = create_transaction(client, headers, account_id, 20, date.today())
+    for tx_id in (first, second):
+        response = client.post(f"/v1/transactions/{tx_id}/attachments?file_name=receipt.txt", content=b"receipt", headers=headers)
+        assert response.status_code == 200, response.text
+    attachment_id = client.get(f"/v1/transactions/{second}/attachments", headers=headers).json()[0]["id"]
+
+    assert client.delete(f"/v1/transactions/{first}", headers=headers).json() is True
+    # The content is shared, so the file stays while the other attachment references it
+    download = client.get(f"/v1/transactions/{second}/attachments/{attachment_id}", headers=headers)
+    assert download.content == b"receipt"
+    assert client.delete(f"/v1/transactions/{second}", headers=headers).json() is True
+    assert client.get("/v1/health").json()["db_pool"]["in_use"] == 0
+
+
+async def _execute(sql, params):
+    async with pooled_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(sql, params)
+
+
+@pytest.mark.parametrize("sql, errno", [
+    ("INSERT INTO attachments (user_id, transaction_id, file_name, file_path) VALUES (%s, 999999, 'x', 'x')", 1452),
+    ("DELETE FROM accounts WHERE user_id = %s", 1451),
+])
+def test_foreign_key_errors_use_mysql_codes(client, user, sql, errno):
+    user_id, headers = user
+    create_transaction(client, headers, create_account(client, headers), 10, date.today())
+    with pytest.raises(IntegrityError) as error:
+        run(client, _execute, sql, (user_id,))
+    assert error.value.args[0] == errno
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from tests.conftest import create, create_account, create_transaction
+
+
+def _pages(client, headers, path, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        ids.extend(row["id"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+def test_cursor_pages_through_equal_dates(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    today = date.today()
+    # Several rows share each date, so pages must break ties on id
+    days = [today, today, today - timedelta(days=1), today, today - timedelta(days=2), today - timedelta(days=1), today]
+    tx_ids = [create_transaction(client, headers, account_id, 1, day) for day in days]
+    expected = [tx_id for _, tx_id in sorted(zip(days, tx_ids), reverse=True)]
+
+    assert _pages(client, headers, "/v1/transactions/", 2) == expected
+    assert _pages(client, headers, "/v1/transactions/", 7) == expected
+    offset = client.get("/v1/transactions/", params={"limit": 2, "offset": 2}, headers=headers).json()
+    assert [row["id"] for row in offset] == expected[2:4]
+
+
+def test_cursor_pages_include_null_sort_values(client, user):
+    _, headers = user
+    account_id = create_account(client, headers)
+    due_dates = [date.today().isoformat(), None, "2024-01-05", None, date.today().isoformat()]
+    payment_ids = [
+        create(client, headers, "/v1/monthly-payments/", {"account_id": account_id, "amount": 1, "due_date": due, "description": "x"})
+        for due in due_dates
+    ]
+    pages = _pages(client, headers, "/v1/monthly-payments/", 2)
+    assert sorted(pages) == sorted(payment_ids)
+    # NULL due dates sort last, and the cursor crosses into them without losing rows
+    assert sorted(pages[-2:]) == [payment_ids[1], payment_ids[3]]
+    assert pages == [row["id"] for row in client.get("/v1/monthly-payments/", params={"limit": 10}, headers=headers).json()]
+
+
+def test_invalid_cursor_is_rejected(client, user):
+    _, headers = user
+    response = client.get("/v1/transactions/", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
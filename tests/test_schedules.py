@@ -0,0 +1,62 @@
+from datetime import date
+from app import schedules
+from tests.conftest import create, create_account
+
+
+def _row(total, installment, start, end=None, row_id=1, account_id=1):
+    return {"id": row_id, "account_id": account_id, "total_amount": total, "installment_amount": installment, "start_date": start, "end_date": end}
+
+
+def test_schedule_clamps_to_month_end_and_settles_the_remainder():
+    result = schedules.schedule(_row(100, 30, "2024-01-31"), as_of=date(2024, 2, 29))
+    assert [(p["date"], p["amount"], p["remaining"], p["paid"]) for p in result["payments"]] == [
+        (date(2024, 1, 31), 30, 70, True),
+        (date(2024, 2, 29), 30, 40, True),
+        (date(2024, 3, 31), 30, 10, False),
+        (date(2024, 4, 30), 10, 0, False),
+    ]
+    assert (result["paid_amount"], result["remaining_amount"]) == (60, 40)
+
+
+def test_end_date_month_pays_off_the_rest():
+    payments = schedules.schedule(_row("99.99", 20, date(2024, 5, 15), date(2024, 6, 1)))["payments"]
+    assert [(p["date"], p["amount"]) for p in payments] == [(date(2024, 5, 15), 20), (date(2024, 6, 15), 79.99)]
+
+
+def test_unschedulable_rows_are_empty():
+    for row in (_row(0, 10, "2024-01-01"), _row(100, 0, "2024-01-01"), _row(100, 10, None)):
+        assert schedules.schedule(row)["payments"] == []
+
+
+def test_next_occurrence():
+    assert schedules.next_occurrence(date(2024, 1, 31), date(2024, 2, 10)) == date(2024, 2, 29)
+    assert schedules.next_occurrence(date(2024, 1, 31), date(2024, 3, 31)) == date(2024, 3, 31)
+    # Never before the anchor itself
+    assert schedules.next_occurrence(date(2024, 6, 5), date(2024, 1, 1)) == date(2024, 6, 5)
+
+
+def test_monthly_projection_bins_payments_by_month():
+    rows = [_row(30, 10, "2024-01-10"), _row(50, 25, "2024-02-28", row_id=2)]
+    projection = schedules.monthly_projection(rows, date(2024, 2, 5), 3)
+    assert [(p["month"], p["amount"], p["payments"]) for p in projection] == [
+        (date(2024, 2, 1), 35, 2),
+        (date(2024, 3, 1), 35, 2),
+        (date(2024, 4, 1), 0, 0),
+    ]
+
+
+def test_schedule_endpoints(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    account_id = create_account(client, headers)
+    inst_id = create(client, headers, "/v1/installments/", {
+        "account_id": account_id, "total_amount": 90, "installment_amount": 30,
+        "start_date": "2024-01-15", "end_date": None, "description": "laptop",
+    })
+    schedule = client.get(f"/v1/installments/{inst_id}/schedule", params={"as_of": "2024-02-15"}, headers=headers).json()
+    assert [p["paid"] for p in schedule["payments"]] == [True, True, False]
+    assert client.get(f"/v1/installments/{inst_id}/schedule", headers=other_headers).status_code == 404
+
+    projection = client.get("/v1/installments/projection", params={"start_date": "2024-03-01", "months": 2}, headers=headers).json()
+    assert [(p["month"], p["amount"]) for p in projection] == [("2024-03-01", 30), ("2024-04-01", 0)]
+    assert client.get("/v1/installments/projection", params={"start_date": "2024-03-01", "months": 2}, headers=other_headers).json()[0]["amount"] == 0